@@ -1,7 +1,6 @@
 from __future__ import with_statement, unicode_literals
 import os
 import codecs
-from importlib import import_module
 
 import six
 from django.core.files.base import ContentFile
@@ -10,14 +9,15 @@ from django.template.loader import render_to_string
 from django.utils.functional import cached_property
 from six.moves.urllib.request import url2pathname
 
-from compressor.cache import get_hexdigest, get_mtime
+from compressor.cache import cache, get_hexdigest, get_hunk_cachekey, get_mtime
 from compressor.conf import settings
 from compressor.exceptions import (CompressorError, UncompressableFileError,
         FilterDoesNotExist)
-from compressor.filters import CachedCompilerFilter
-from compressor.storage import compressor_file_storage
+from compressor.filters import CachedCompilerFilter, FilterBase
+from compressor.output import render_output_template
+from compressor.storage import compressor_file_storage, record_output
 from compressor.signals import post_compress
-from compressor.utils import get_class, get_mod_func, staticfiles
+from compressor.utils import get_class, import_path, staticfiles
 
 # Some constants for nicer handling.
 SOURCE_HUNK, SOURCE_FILE = 'inline', 'file'
@@ -126,8 +126,22 @@ class Compressor(object):
         if basename:
             filename = os.path.split(basename)[1]
             parts.append(os.path.splitext(filename)[0])
-        parts.extend([get_hexdigest(content, 12), self.resource_kind])
-        return os.path.join(self.output_dir, self.output_prefix, '.'.join(parts))
+        digest = get_hexdigest(content, 12)
+        parts.extend([digest, self.resource_kind])
+        return self.get_output_filepath(self.output_prefix, digest, '.'.join(parts))
+
+    def get_output_filepath(self, prefix, digest, filename):
+        """
+        Returns the path of the output file ``filename`` in the ``prefix``
+        subdirectory of the output directory. With
+        ``COMPRESS_OUTPUT_SHARD_LENGTH`` set, files are spread over
+        subdirectories named after the start of their ``digest``, e.g.
+        "CACHE/css/58/58a8c0714e59.css".
+        """
+        shard_length = settings.COMPRESS_OUTPUT_SHARD_LENGTH
+        if shard_length:
+            return os.path.join(self.output_dir, prefix, digest[:shard_length], filename)
+        return os.path.join(self.output_dir, prefix, filename)
 
     def get_filename(self, basename):
         """
@@ -245,6 +259,38 @@ class Compressor(object):
         """
         return self.filter(content, self.cached_filters, method=METHOD_OUTPUT)
 
+    @cached_property
+    def filter_output_per_hunk(self):
+        """
+        Whether the output filters may run on each hunk separately, which
+        needs all filters with an 'output' method to be concatenation-safe.
+        """
+        if not settings.COMPRESS_OUTPUT_FILTER_HUNKS:
+            return False
+        return all(getattr(filter_cls, 'concatenation_safe', False)
+                   for filter_cls in self.cached_filters
+                   if getattr(filter_cls, 'output', None) is not FilterBase.output)
+
+    def filter_output_hunks(self, hunks):
+        """
+        Passes each hunk to the 'output' methods of the compressor filters
+        and concatenates the results, which are cached by the hunk's content
+        so that only changed hunks are filtered again.
+        """
+        filters = ','.join('%s.%s' % (filter_cls.__module__, filter_cls.__name__)
+                           for filter_cls in self.cached_filters)
+        keys = [get_hunk_cachekey(self.resource_kind, filters, hunk) for hunk in hunks]
+        cached = cache.get_many(keys)
+        missing = {}
+        filtered = []
+        for key, hunk in zip(keys, hunks):
+            if key not in cached:
+                cached[key] = missing[key] = self.filter_output(hunk)
+            filtered.append(cached[key])
+        if missing:
+            cache.set_many(missing, settings.COMPRESS_REBUILD_TIMEOUT)
+        return '\n'.join(filtered)
+
     def filter_input(self, forced=False):
         """
         Passes each hunk (file or code) to the 'input' methods
@@ -277,16 +323,13 @@ class Compressor(object):
                                   "COMPRESS_PRECOMPILERS setting for "
                                   "mimetype '%s'." % mimetype)
 
-        mod_name, cls_name = get_mod_func(filter_or_command)
         try:
-            mod = import_module(mod_name)
+            precompiler_class = import_path(filter_or_command)
         except (ImportError, TypeError):
             filter = CachedCompilerFilter(
                 content=content, filter_type=self.resource_kind, filename=filename,
                 charset=charset, command=filter_or_command, mimetype=mimetype)
             return True, filter.input(**kwargs)
-        try:
-            precompiler_class = getattr(mod, cls_name)
         except AttributeError:
             raise FilterDoesNotExist('Could not find "%s".' % filter_or_command)
         filter = precompiler_class(
@@ -311,13 +354,17 @@ class Compressor(object):
         any custom modification. Calls other mode specific methods or simply
         returns the content directly.
         """
-        output = '\n'.join(self.filter_input(forced))
+        hunks = self.filter_input(forced)
+        output = '\n'.join(hunks)
 
         if not output:
             return ''
 
         if settings.COMPRESS_ENABLED or forced:
-            filtered_output = self.filter_output(output)
+            if self.filter_output_per_hunk:
+                filtered_output = self.filter_output_hunks(hunks)
+            else:
+                filtered_output = self.filter_output(output)
             return self.handle_output(mode, filtered_output, forced, basename)
 
         return output
@@ -339,6 +386,7 @@ class Compressor(object):
         new_filepath = self.get_filepath(content, basename=basename)
         if not self.storage.exists(new_filepath) or forced:
             self.storage.save(new_filepath, ContentFile(content.encode(self.charset)))
+        record_output(new_filepath)
         url = mark_safe(self.storage.url(new_filepath))
         return self.render_output(mode, {"url": url})
 
@@ -378,4 +426,7 @@ class Compressor(object):
         post_compress.send(sender=self.__class__, type=self.resource_kind,
                            mode=mode, context=final_context)
         template_name = self.get_template_name(mode)
+        rendered = render_output_template(template_name, final_context)
+        if rendered is not None:
+            return rendered
         return render_to_string(template_name, context=final_context)
@@ -1,21 +1,15 @@
-import json
 import hashlib
 import os
 import socket
 import time
-from importlib import import_module
 
 import six
 from django.core.cache import caches
-from django.core.files.base import ContentFile
 from django.utils.encoding import smart_bytes
 from django.utils.functional import SimpleLazyObject
 from compressor.compatible import force_text
 from compressor.conf import settings
-from compressor.storage import default_storage
-from compressor.utils import get_mod_func
-
-_cachekey_func = None
+from compressor.utils import get_class, import_path
 
 
 def get_hexdigest(plaintext, length=None):
@@ -34,16 +28,12 @@ def socket_cachekey(key):
 
 
 def get_cachekey(*args, **kwargs):
-    global _cachekey_func
-    if _cachekey_func is None:
-        try:
-            mod_name, func_name = get_mod_func(
-                settings.COMPRESS_CACHE_KEY_FUNCTION)
-            _cachekey_func = getattr(import_module(mod_name), func_name)
-        except (AttributeError, ImportError, TypeError) as e:
-            raise ImportError("Couldn't import cache key function %s: %s" %
-                              (settings.COMPRESS_CACHE_KEY_FUNCTION, e))
-    return _cachekey_func(*args, **kwargs)
+    try:
+        cachekey_func = import_path(settings.COMPRESS_CACHE_KEY_FUNCTION)
+    except (AttributeError, ImportError, TypeError) as e:
+        raise ImportError("Couldn't import cache key function %s: %s" %
+                          (settings.COMPRESS_CACHE_KEY_FUNCTION, e))
+    return cachekey_func(*args, **kwargs)
 
 
 def get_mtime_cachekey(filename):
@@ -75,15 +65,15 @@ def get_offline_manifest_filename():
 _offline_manifest = None
 
 
+def get_offline_manifest_backend():
+    return get_class(settings.COMPRESS_OFFLINE_MANIFEST_BACKEND)()
+
+
 def get_offline_manifest():
     global _offline_manifest
     if _offline_manifest is None:
         filename = get_offline_manifest_filename()
-        if default_storage.exists(filename):
-            with default_storage.open(filename) as fp:
-                _offline_manifest = json.loads(fp.read().decode('utf8'))
-        else:
-            _offline_manifest = {}
+        _offline_manifest = get_offline_manifest_backend().load(filename)
     return _offline_manifest
 
 
@@ -94,8 +84,7 @@ def flush_offline_manifest():
 
 def write_offline_manifest(manifest):
     filename = get_offline_manifest_filename()
-    content = json.dumps(manifest, indent=2).encode('utf8')
-    default_storage.save(filename, ContentFile(content))
+    get_offline_manifest_backend().save(filename, manifest)
     flush_offline_manifest()
 
 
@@ -104,6 +93,10 @@ def get_templatetag_cachekey(compressor, mode, kind):
         "templatetag.%s.%s.%s" % (compressor.cachekey, mode, kind))
 
 
+def get_hunk_cachekey(kind, filters, content):
+    return get_cachekey("hunk.%s.%s" % (kind, get_hexdigest(filters + content)))
+
+
 def get_mtime(filename):
     if settings.COMPRESS_MTIME_DELAY:
         key = get_mtime_cachekey(filename)
@@ -23,8 +23,23 @@ class CompressorConf(AppConf):
     # the backend to use when parsing the JavaScript or Stylesheet files
     PARSER = 'compressor.parser.AutoSelectParser'
     OUTPUT_DIR = 'CACHE'
+    # put output files in subdirectories named after the first this many
+    # characters of their hash, 0 keeps them all in one directory
+    OUTPUT_SHARD_LENGTH = 0
     STORAGE = 'compressor.storage.CompressorFileStorage'
+    # formats, levels and minimum file size (in bytes) for the
+    # precompressed variants of PrecompressedCompressorFileStorage
+    PRECOMPRESS_FORMATS = ('gz', 'br')
+    PRECOMPRESS_LEVELS = {}
+    PRECOMPRESS_MIN_SIZE = 0
+    # threads compressing the variants, None for the executor's default
+    PRECOMPRESS_WORKERS = None
+    # compress the variants in the background instead of while rendering
+    PRECOMPRESS_ASYNC = False
     PRIVATE_DIRS = None
+    # scratch directory for the temporary files of compilers and parcel,
+    # e.g. a tmpfs mount like '/dev/shm' to keep builds off the disk
+    TMP_DIR = None
 
     COMPRESSORS = dict(
         css='compressor.css.CssCompressor',
@@ -41,6 +56,9 @@ class CompressorConf(AppConf):
     JS_FILTERS = None
     PARCEL_FILTERS = None
 
+    # keep the source maps written by parcel, saved as '<output file>.map'
+    SOURCE_MAPS = False
+
     CSS_HASHING_METHOD = 'mtime'
 
     PRECOMPILERS = (
@@ -62,6 +80,12 @@ class CompressorConf(AppConf):
     CLEAN_CSS_BINARY = 'cleancss'
     CLEAN_CSS_ARGUMENTS = ''
     DATA_URI_MAX_SIZE = 1024
+    # the number of worker processes running the Python minifiers per kind,
+    # e.g. {'js': 4, 'css': 2}; kinds not given are minified in the
+    # rendering thread
+    FILTER_PROCESSES = {}
+    # the bytes of data: URIs the DataUriFilter keeps in memory for reuse
+    DATA_URI_CACHE_SIZE = 4 * 1024 * 1024
 
     # the cache backend to use
     CACHE_BACKEND = None
@@ -74,6 +98,9 @@ class CompressorConf(AppConf):
     MINT_DELAY = 30  # seconds
     # check for file changes only after a delay
     MTIME_DELAY = 10  # seconds
+    # run concatenation-safe output filters on each hunk, caching the results
+    # for REBUILD_TIMEOUT, instead of on the whole output
+    OUTPUT_FILTER_HUNKS = False
     # enables the offline cache -- also filled by the compress command
     OFFLINE = False
     # invalidates the offline cache after one year
@@ -82,6 +109,14 @@ class CompressorConf(AppConf):
     OFFLINE_CONTEXT = {}
     # The name of the manifest file (e.g. filename.ext)
     OFFLINE_MANIFEST = 'manifest.json'
+    # The format of the manifest, SqliteManifest loads entries on demand
+    OFFLINE_MANIFEST_BACKEND = 'compressor.offline.manifest.JsonManifest'
+    # the file in COMPRESS_OUTPUT_DIR listing the output files blocks were
+    # rendered with, which compress_gc keeps, e.g. 'output.log'
+    OUTPUT_LOG = None
+    # only parse templates mentioning "compress" or extending such templates
+    # when compressing offline
+    OFFLINE_PRESCAN = True
     # The Context to be used when TemplateFilter is used
     TEMPLATE_FILTER_CONTEXT = {}
     # Placeholder to be used instead of settings.COMPRESS_URL during offline compression.
@@ -1,6 +1,10 @@
 from jinja2 import nodes
 from jinja2.ext import Extension
 from jinja2.exceptions import TemplateSyntaxError
+try:
+    from jinja2 import pass_context
+except ImportError:  # Jinja2 < 3.0
+    from jinja2 import contextfunction as pass_context
 
 from compressor.templatetags import compress
 
@@ -68,19 +72,30 @@ class CompressorExtension(compress.CompressorMixin, Extension):
             self.call_method('_compress_normal', [kindarg, modearg, namearg]),
             [], [], body).set_lineno(lineno)
 
-    def _compress_forced(self, kind, mode, name, caller):
-        return self._compress(kind, mode, name, caller, True)
+    @pass_context
+    def _compress_forced(self, jinja2_context, kind, mode, name, caller):
+        return self._compress(jinja2_context, kind, mode, name, caller, True)
 
-    def _compress_normal(self, kind, mode, name, caller):
-        return self._compress(kind, mode, name, caller, False)
+    @pass_context
+    def _compress_normal(self, jinja2_context, kind, mode, name, caller):
+        return self._compress(jinja2_context, kind, mode, name, caller, False)
 
-    def _compress(self, kind, mode, name, caller, forced):
+    def _compress(self, jinja2_context, kind, mode, name, caller, forced):
         mode = mode or compress.OUTPUT_FILE
         original_content = caller()
+        # the Jinja2 context lives as long as the template is rendered
+        memo = getattr(jinja2_context, compress.RENDER_MEMO_KEY, None)
+        if memo is None:
+            memo = {}
+            setattr(jinja2_context, compress.RENDER_MEMO_KEY, memo)
         context = {
-            'original_content': original_content
+            'original_content': original_content,
+            compress.RENDER_MEMO_KEY: memo,
         }
         return self.render_compressed(context, kind, mode, name, forced=forced)
 
     def get_original_content(self, context):
         return context['original_content']
+
+    def get_render_memo(self, context):
+        return context.get(compress.RENDER_MEMO_KEY)
@@ -5,31 +5,68 @@
  using: https://github.com/django-compressor/django-compressor.git
  and: https://github.com/ojii/django-sekizai.git@0.6 or later
 """
+from functools import lru_cache
+
 from compressor.templatetags.compress import CompressorNode
 from compressor.exceptions import UncompressableFileError
 from compressor.base import Compressor
 from compressor.conf import settings
 from compressor.utils import get_class
 
+from django.core.signals import setting_changed
 from django.template.base import TextNode
 
 
-def compress(context, data, name):
+class SelectedElementsParser(object):
     """
-    Data is the string from the template (the list of js files in this case)
-    Name is either 'js' or 'css' (the sekizai namespace)
-    Basically passes the string through the {% compress 'js' %} template tag
+    Gives the compressor only the selected elements of an already parsed
+    content instead of parsing their markup again.
+    """
+    def __init__(self, parser, elems):
+        self.parser = parser
+        self.elems = elems
+
+    def css_elems(self):
+        return self.elems
+
+    def js_elems(self):
+        return self.elems
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+
+class SekizaiCompressorNode(CompressorNode):
+
+    def __init__(self, parser, kind):
+        super(SekizaiCompressorNode, self).__init__(
+            nodelist=TextNode(''.join(parser.elem_str(e) for e in parser.elems)),
+            kind=kind, mode='file')
+        self.parser = parser
+
+    def get_compressor(self, context, kind, content=None):
+        compressor = super(SekizaiCompressorNode, self).get_compressor(context, kind, content)
+        compressor.parser = self.parser
+        return compressor
+
+
+@lru_cache(maxsize=256)
+def classify(data, name):
+    """
+    Parses the elements of the sekizai namespace ``name`` once and returns
+    the markup of the elements to leave as they are, the parser of the
+    compressable ones and the markup of the deferred ones. The result is
+    remembered per content.
     """
-    # separate compressable from uncompressable files
     parser = get_class(settings.COMPRESS_PARSER)(data)
-    js_compressor, css_compressor = Compressor('js'), Compressor('css')
+    compressor = Compressor(name)
     compressable_elements, expanded_elements, deferred_elements = [], [], []
     if name == 'js':
         for elem in parser.js_elems():
             attribs = parser.elem_attribs(elem)
             try:
                 if 'src' in attribs:
-                    js_compressor.get_basename(attribs['src'])
+                    compressor.get_basename(attribs['src'])
             except UncompressableFileError:
                 if 'defer' in attribs:
                     deferred_elements.append(elem)
@@ -42,22 +79,36 @@ def compress(context, data, name):
             attribs = parser.elem_attribs(elem)
             try:
                 if parser.elem_name(elem) == 'link' and attribs['rel'].lower() == 'stylesheet':
-                    css_compressor.get_basename(attribs['href'])
+                    compressor.get_basename(attribs['href'])
             except UncompressableFileError:
                 expanded_elements.append(elem)
             else:
                 compressable_elements.append(elem)
 
-    # reconcatenate them
-    data = ''.join(parser.elem_str(e) for e in expanded_elements)
-    expanded_node = CompressorNode(nodelist=TextNode(data), kind=name, mode='file')
-    data = ''.join(parser.elem_str(e) for e in compressable_elements)
-    compressable_node = CompressorNode(nodelist=TextNode(data), kind=name, mode='file')
-    data = ''.join(parser.elem_str(e) for e in deferred_elements)
-    deferred_node = CompressorNode(nodelist=TextNode(data), kind=name, mode='file')
+    return (''.join(parser.elem_str(e) for e in expanded_elements),
+            SelectedElementsParser(parser, compressable_elements),
+            ''.join(parser.elem_str(e) for e in deferred_elements))
+
+
+def reset_classify_cache(**kwargs):
+    classify.cache_clear()
+
+
+setting_changed.connect(reset_classify_cache)
+
+
+def compress(context, data, name):
+    """
+    Data is the string from the template (the list of js files in this case)
+    Name is either 'js' or 'css' (the sekizai namespace)
+    Basically passes the string through the {% compress 'js' %} template tag
+    """
+    # separate compressable from uncompressable files
+    expanded, compressable_parser, deferred = classify(data, name)
+    compressable_node = SekizaiCompressorNode(compressable_parser, name)
 
     return '\n'.join([
-        expanded_node.get_original_content(context=context),
+        expanded,
         compressable_node.render(context=context),
-        deferred_node.get_original_content(context=context),
+        deferred,
     ])
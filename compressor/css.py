@@ -35,6 +35,8 @@ class CssCompressor(Compressor):
                     self.media_nodes[-1][1].split_content.append(data)
                 else:
                     node = self.copy(content=self.parser.elem_str(elem))
+                    # share the parsed elements instead of parsing them again
+                    node.parser = self.parser
                     node.split_content.append(data)
                     self.media_nodes.append((media, node))
         return self.split_content
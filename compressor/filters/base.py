@@ -1,10 +1,11 @@
 from __future__ import absolute_import, unicode_literals
 import os
 import io
+import errno
 import logging
 import subprocess
+import tempfile
 
-from importlib import import_module
 from platform import system
 
 if system() != "Windows":
@@ -27,7 +28,8 @@ from compressor.cache import cache, get_precompiler_cachekey
 
 from compressor.conf import settings
 from compressor.exceptions import FilterError
-from compressor.utils import get_mod_func
+from compressor.filters import pool
+from compressor.utils import import_path
 
 
 logger = logging.getLogger("compressor.filters")
@@ -47,6 +49,11 @@ class FilterBase(object):
     # This flag allows those filters to do so.
     run_with_compression_disabled = False
 
+    # Whether the 'output' method gives the same result for concatenated
+    # content as for each part of it, concatenated, so that it may be run
+    # on each hunk separately (COMPRESS_OUTPUT_FILTER_HUNKS).
+    concatenation_safe = False
+
     def __init__(self, content, attrs=None, filter_type=None, filename=None,
                  verbose=0, charset=None, **kwargs):
         self.type = filter_type or getattr(self, 'type', None)
@@ -61,14 +68,28 @@ class FilterBase(object):
 
     def output(self, **kwargs):
         raise NotImplementedError
-    
-    def get_tmpdir(self):
-        dirname = os.path.join(settings.BASE_DIR, '.tmp') if settings.BASE_DIR else '/tmp/'
-        if dirname is not '/tmp/' and not os.path.exists(dirname):
-            os.mkdir(dirname)
 
+    def get_tmpdir(self):
+        """
+        Returns the directory used for temporary input and output files.
+
+        ``COMPRESS_TMP_DIR`` wins if set, otherwise ``.tmp`` in the
+        project's ``BASE_DIR`` or the system's temporary directory.
+        """
+        dirname = settings.COMPRESS_TMP_DIR
+        if not dirname:
+            base_dir = getattr(settings, 'BASE_DIR', None)
+            if not base_dir:
+                return tempfile.gettempdir()
+            dirname = os.path.join(base_dir, '.tmp')
+        try:
+            os.makedirs(dirname)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
         return dirname
 
+
 class CallbackOutputFilter(FilterBase):
     """
     A filter which takes function path in `callback` attribute, imports it
@@ -78,7 +99,9 @@ class CallbackOutputFilter(FilterBase):
             callback = 'path.to.my.callback'
 
     Callback should be a function which takes a string as first argument and
-    returns a string (unicode under python 2).
+    returns a string (unicode under python 2). It's called in a worker
+    process if ``COMPRESS_FILTER_PROCESSES`` gives processes for the
+    filter's type.
     """
     callback = None
     args = []
@@ -92,8 +115,7 @@ class CallbackOutputFilter(FilterBase):
                 "The callback filter %s must define a 'callback' attribute." %
                 self.__class__.__name__)
         try:
-            mod_name, func_name = get_mod_func(self.callback)
-            func = getattr(import_module(mod_name), func_name)
+            func = import_path(self.callback)
         except (ImportError, TypeError):
             if self.dependencies:
                 if len(self.dependencies) == 1:
@@ -113,7 +135,11 @@ class CallbackOutputFilter(FilterBase):
             self._callback_func = func
 
     def output(self, **kwargs):
-        ret = self._callback_func(self.content, *self.args, **self.kwargs)
+        if pool.get_pool(self.type) is None:
+            ret = self._callback_func(self.content, *self.args, **self.kwargs)
+        else:
+            ret = pool.run(self.type, self.callback, self.content,
+                           self.args, self.kwargs)
         assert isinstance(ret, six.text_type)
         return ret
 
@@ -157,11 +183,12 @@ class CompilerFilter(FilterBase):
 
         encoding = self.default_encoding
         options = dict(self.options)
+        tmpdir = self.get_tmpdir() if settings.COMPRESS_TMP_DIR else None
 
         if self.infile is None and "{infile}" in self.command:
             # create temporary input file if needed
             if self.filename is None:
-                self.infile = NamedTemporaryFile(mode='wb')
+                self.infile = NamedTemporaryFile(mode='wb', dir=tmpdir)
                 self.infile.write(self.content.encode(encoding))
                 self.infile.flush()
                 options["infile"] = self.infile.name
@@ -177,7 +204,7 @@ class CompilerFilter(FilterBase):
         if "{outfile}" in self.command and "outfile" not in options:
             # create temporary output file if needed
             ext = self.type and ".%s" % self.type or ""
-            self.outfile = NamedTemporaryFile(mode='r+', suffix=ext)
+            self.outfile = NamedTemporaryFile(mode='r+', suffix=ext, dir=tmpdir)
             options["outfile"] = self.outfile.name
 
         # Quote infile and outfile for spaces etc.
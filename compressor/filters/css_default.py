@@ -140,6 +140,9 @@ class CssRelativeFilter(CssAbsoluteFilter):
         If ``settings.COMPRESS_OUTPUT_DIR == 'my/compiled/data'``,
         the depth is 3, and the prefix will be '../../../../'.
 
+        With ``settings.COMPRESS_OUTPUT_SHARD_LENGTH`` set, the files are
+        one folder deeper, so the prefix gets another '../'.
+
         Example:
 
         - original file URL: '/static/my-app/style.css'
@@ -156,4 +159,7 @@ class CssRelativeFilter(CssAbsoluteFilter):
         new_prefix += '/..' * len(list(filter(
             None, os.path.normpath(settings.COMPRESS_OUTPUT_DIR).split(os.sep)
         )))
+        # and one more from the shard folder
+        if settings.COMPRESS_OUTPUT_SHARD_LENGTH:
+            new_prefix += '/..'
         return re.sub('^{}'.format(old_prefix), new_prefix, url)
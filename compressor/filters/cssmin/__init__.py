@@ -16,6 +16,7 @@ class rCSSMinFilter(CallbackOutputFilter):
     kwargs = {
         "keep_bang_comments": True
     }
+    concatenation_safe = True
 
 
 # This is for backwards compatibility.
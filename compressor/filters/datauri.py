@@ -2,12 +2,58 @@ from __future__ import unicode_literals
 import os
 import re
 import mimetypes
+import threading
 from base64 import b64encode
+from collections import OrderedDict
+
+from django.core.signals import setting_changed
 
 from compressor.conf import settings
 from compressor.filters import FilterBase
 
 
+class EncodedAssetCache(object):
+    """
+    Remembers the data: URIs of the embedded files by path, modification
+    time and size, dropping the least recently used ones once they take
+    more than ``COMPRESS_DATA_URI_CACHE_SIZE`` bytes.
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        max_size = settings.COMPRESS_DATA_URI_CACHE_SIZE
+        if len(value) > max_size:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > max_size:
+                _, dropped = self.entries.popitem(last=False)
+                self.size -= len(dropped)
+
+    def clear(self, **kwargs):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+encoded_assets = EncodedAssetCache()
+setting_changed.connect(encoded_assets.clear)
+
+
 class DataUriFilter(FilterBase):
     """Filter for embedding media as data: URIs.
 
@@ -21,30 +67,48 @@ class DataUriFilter(FilterBase):
     def input(self, filename=None, **kwargs):
         if not filename or not filename.startswith(settings.COMPRESS_ROOT):
             return self.content
+        # the replacements of the urls found in this content
+        self.converted = {}
         output = self.content
         for url_pattern in self.url_patterns:
             output = url_pattern.sub(self.data_uri_converter, output)
         return output
 
     def get_file_path(self, url):
-        # strip query string of file paths
-        if "?" in url:
-            url = url.split("?")[0]
-        if "#" in url:
-            url = url.split("#")[0]
+        # strip query string and fragment of file paths
+        url = url.partition("?")[0].partition("#")[0]
         return os.path.join(
             settings.COMPRESS_ROOT, url[len(settings.COMPRESS_URL):])
 
+    def get_data_uri(self, path):
+        """
+        Returns the data: URI of the file at ``path``, or None if it's
+        larger than ``COMPRESS_DATA_URI_MAX_SIZE``.
+        """
+        stat = os.stat(path)
+        if stat.st_size > settings.COMPRESS_DATA_URI_MAX_SIZE:
+            return None
+        key = (path, stat.st_mtime, stat.st_size)
+        data_uri = encoded_assets.get(key)
+        if data_uri is None:
+            with open(path, 'rb') as file:
+                data = b64encode(file.read()).decode('ascii')
+            data_uri = 'data:%s;base64,%s' % (mimetypes.guess_type(path)[0], data)
+            encoded_assets.set(key, data_uri)
+        return data_uri
+
     def data_uri_converter(self, matchobj):
         url = matchobj.group(1).strip(' \'"')
+        converted = getattr(self, 'converted', {})
+        try:
+            return converted[url]
+        except KeyError:
+            pass
+        data_uri = None
         if not url.startswith('data:') and not url.startswith('//'):
-            path = self.get_file_path(url)
-            if os.stat(path).st_size <= settings.COMPRESS_DATA_URI_MAX_SIZE:
-                with open(path, 'rb') as file:
-                    data = b64encode(file.read()).decode('ascii')
-                return 'url("data:%s;base64,%s")' % (
-                    mimetypes.guess_type(path)[0], data)
-        return 'url("%s")' % url
+            data_uri = self.get_data_uri(self.get_file_path(url))
+        converted[url] = 'url("%s")' % (data_uri or url)
+        return converted[url]
 
 
 class CssDataUriFilter(DataUriFilter):
@@ -3,7 +3,7 @@ import six
 
 from django.core.exceptions import ImproperlyConfigured
 
-from compressor.filters import FilterBase, CallbackOutputFilter
+from compressor.filters import FilterBase, CallbackOutputFilter, pool
 
 
 class rJSMinFilter(CallbackOutputFilter):
@@ -12,6 +12,7 @@ class rJSMinFilter(CallbackOutputFilter):
     kwargs = {
         "keep_bang_comments": True
     }
+    concatenation_safe = True
 
 
 # This is for backwards compatibility
@@ -26,6 +27,15 @@ class SlimItFilter(CallbackOutputFilter):
     }
 
 
+def calmjs_minify(content):
+    """
+    Minifies the content with calmjs' default parser and unparser.
+    """
+    import calmjs.parse
+    printer = calmjs.parse.unparsers.es5.minify_printer(obfuscate=True)
+    return u''.join(part.text for part in printer(calmjs.parse.es5(content)))
+
+
 class CalmjsFilter(FilterBase):
     def __init__(self, *args, **kwargs):
         try:
@@ -43,13 +53,19 @@ class CalmjsFilter(FilterBase):
             raise ImproperlyConfigured(
                 "The module calmjs.parse couldn't be imported. "
                 "Make sure it is correctly installed.")
+        # only the default parser and unparser are used in worker processes
+        self._pooled = self._parser is None and self._unparser is None
         if self._parser is None:
             self._parser = calmjs.parse.es5
         if self._unparser is None:
             self._unparser = calmjs.parse.unparsers.es5.minify_printer(obfuscate=True)
 
     def output(self, **kwargs):
-        program = self._parser(self.content)
-        minified = u''.join(part.text for part in self._unparser(program))
+        if self._pooled and pool.get_pool(self.type) is not None:
+            minified = pool.run(
+                self.type, 'compressor.filters.jsmin.calmjs_minify', self.content)
+        else:
+            program = self._parser(self.content)
+            minified = u''.join(part.text for part in self._unparser(program))
         assert isinstance(minified, six.text_type)
         return minified
@@ -4,12 +4,30 @@ from compressor.conf import settings
 from compressor.filters.base import (
     NamedTemporaryFile, subprocess, shell_quote, FilterError, smart_text, io
 )
+from compressor.sourcemap import MappedText, read_source_map, strip_source_mapping_url
 
 parcel_absolute_url_skip = '///..'
 parcel_offline_args = '--no-source-maps --no-autoinstall --no-content-hash'
 parcel_args = '--no-minify --no-source-maps --no-autoinstall --no-content-hash'
 
 
+def get_parcel_args(offline, source_maps=False):
+    args = parcel_offline_args if offline else parcel_args
+    if source_maps:
+        args = args.replace('--no-source-maps ', '')
+    return args
+
+
+def get_source_map_paths(path):
+    """
+    Returns the paths parcel may write the source map of ``path`` to.
+    """
+    paths = [path + '.map']
+    if path.endswith('.js'):
+        paths.append(os.path.splitext(path)[0] + '.map')
+    return paths
+
+
 class ParserFilter(CompilerFilter):
     command = "parcel build"
 
@@ -45,7 +63,11 @@ class ParserFilter(CompilerFilter):
             with io.open(outfile_path, 'r', encoding=encoding) as file:
                 filtered = file.read()
             return filtered
-    
+
+    def read_stdout(self, filtered, **kwargs):
+        # pipe mode, the command has no {outfile} and writes to stdout
+        return filtered
+
     def close_all_file(self, options, **kwargs):
         if self.infile is not None:
             self.infile.close()
@@ -88,7 +110,10 @@ class ParserFilter(CompilerFilter):
             if self.verbose:
                 self.logger.debug(err)
 
-            output = self.read_output_files(options, encoding, **kwargs)
+            if "outfile" in options:
+                output = self.read_output_files(options, encoding, **kwargs)
+            else:
+                output = self.read_stdout(filtered, **kwargs)
         finally:
             self.close_all_file(options, **kwargs)
         return self.get_refined_output(output, **kwargs) 
@@ -102,16 +127,11 @@ class ParserFilterJS(ParserFilter):
             return ('js', self.content), ('css', None)
 
         _kind = kwargs.get('kind')
+        args = get_parcel_args(settings.COMPRESS_OFFLINE, settings.COMPRESS_SOURCE_MAPS)
         if _kind == 'file':
-            if (settings.COMPRESS_OFFLINE):
-                self.command = self.command + " {file_name} " + parcel_offline_args + " -d {dir} --out-file {outfile}"
-            else:
-                self.command = self.command + " {file_name} " + parcel_args + "  -d {dir} --out-file {outfile}"
+            self.command = self.command + " {file_name} " + args + " -d {dir} --out-file {outfile}"
         else:
-            if (settings.COMPRESS_OFFLINE):
-                self.command = self.command + " {infile} " + parcel_offline_args + " -d {dir} --out-file {outfile}"
-            else:
-                self.command = self.command + " {infile} " + parcel_args + "  -d {dir} --out-file {outfile}"
+            self.command = self.command + " {infile} " + args + " -d {dir} --out-file {outfile}"
         return super().input(**kwargs)
     
     def process_infile(self, options, encoding, **kwargs):
@@ -151,30 +171,56 @@ class ParserFilterJS(ParserFilter):
             options["infile"] = shell_quote(options["infile"])
         if "outfile" in options:
             options["outfile"] = shell_quote(options["outfile"])
+        if "outfile_css" in options:
             options["outfile_css"] = shell_quote(options["outfile_css"])
 
+    def read_output_file(self, path, encoding):
+        with io.open(path, 'r', encoding=encoding) as file:
+            filtered = file.read()
+        if not settings.COMPRESS_SOURCE_MAPS:
+            return filtered
+        # the map is referenced by the output file instead
+        source_map = read_source_map(get_source_map_paths(path))
+        return MappedText(strip_source_mapping_url(filtered), source_map)
+
     def read_output_files(self, options, encoding, **kwargs):
         outfile_path = options.get('outfile')
-        css_filtered, outfile_path_css = None, options.get('outfile_css')
+        filtered, css_filtered = None, None
+        outfile_path_css = options.get('outfile_css')
         if outfile_path:
-            with io.open(outfile_path, 'r', encoding=encoding) as file:
-                filtered = file.read()
+            filtered = self.read_output_file(outfile_path, encoding)
         if outfile_path_css and os.path.exists(outfile_path_css):
-            with io.open(outfile_path_css, 'r', encoding=encoding) as file:
-                css_filtered = file.read()
+            css_filtered = self.read_output_file(outfile_path_css, encoding)
         return filtered, css_filtered
-    
+
+    def read_stdout(self, filtered, **kwargs):
+        return filtered, None
+
     def close_all_file(self, options, **kwargs):
         if self.infile is not None:
             self.infile.close()
         if self.outfile is not None:
             self.outfile.close()
-        if os.path.exists(options.get('outfile_css')):
-            os.remove(options.get('outfile_css'))
-    
+        outfile_css = options.get('outfile_css')
+        if outfile_css and os.path.exists(outfile_css):
+            os.remove(outfile_css)
+        if self.outfile is not None and settings.COMPRESS_SOURCE_MAPS:
+            base = os.path.splitext(self.outfile.name)[0]
+            for path in get_source_map_paths(self.outfile.name) + get_source_map_paths(base + '.css'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def refine(filtered):
+        refined = smart_text(filtered.replace(parcel_absolute_url_skip, ''))
+        source_map = getattr(filtered, 'source_map', None)
+        if source_map:
+            return MappedText(refined, source_map)
+        return refined
+
     def get_refined_output(self, output, **kwargs):
         filtered, css_filtered = output
-        return ('js', smart_text(filtered.replace(parcel_absolute_url_skip, ''))), ('css', smart_text(css_filtered.replace(parcel_absolute_url_skip, ''))) if css_filtered else ('css', css_filtered)
+        return ('js', self.refine(filtered)), ('css', self.refine(css_filtered)) if css_filtered else ('css', css_filtered)
 
 
 # django-compress has best implementation
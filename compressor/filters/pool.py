@@ -0,0 +1,71 @@
+"""
+Runs the Python minifiers in worker processes.
+
+Minifiers like rjsmin hold the GIL while they run, so blocks compressed by
+several threads, e.g. by ``compress_warm``, are minified one at a time.
+With ``COMPRESS_FILTER_PROCESSES`` set for a kind, the callback filters of
+that kind hand their content to a pool of processes instead.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+
+from django.core.signals import setting_changed
+
+from compressor.conf import settings
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def call(path, content, args, kwargs):
+    """
+    Calls the function at the dotted ``path`` with the content, in the
+    worker process.
+    """
+    module, attr = path.rsplit('.', 1)
+    return getattr(import_module(module), attr)(content, *args, **kwargs)
+
+
+def get_pool(kind):
+    """
+    Returns the process pool minifying content of ``kind``, or None if
+    it's minified in the calling thread.
+    """
+    processes = settings.COMPRESS_FILTER_PROCESSES.get(kind)
+    if not processes:
+        return None
+    with _lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            pool = _pools[kind] = ProcessPoolExecutor(max_workers=processes)
+        return pool
+
+
+def run(kind, path, content, args=(), kwargs=None):
+    """
+    Returns the result of the function at the dotted ``path`` called with
+    the content and the given arguments, in the pool of ``kind`` if any.
+    """
+    kwargs = kwargs or {}
+    pool = get_pool(kind)
+    if pool is None:
+        return call(path, content, args, kwargs)
+    return pool.submit(call, path, content, tuple(args), dict(kwargs)).result()
+
+
+def shutdown(**kwargs):
+    """
+    Shuts the process pools down when COMPRESS_FILTER_PROCESSES changes,
+    the next filter starts new ones.
+    """
+    if kwargs.get('setting') != 'COMPRESS_FILTER_PROCESSES':
+        return
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
+setting_changed.connect(shutdown)
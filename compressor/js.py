@@ -36,6 +36,8 @@ class JsCompressor(Compressor):
                 self.extra_nodes[-1][1].split_content.append(content)
             else:
                 node = self.copy(content=self.parser.elem_str(elem))
+                # share the parsed elements instead of parsing them again
+                node.parser = self.parser
                 node.split_content.append(content)
                 self.extra_nodes.append((extra, node))
         return self.split_content
@@ -4,6 +4,8 @@ import os
 import sys
 
 from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from copy import copy
 from fnmatch import fnmatch
 from importlib import import_module
 
@@ -12,19 +14,50 @@ import six
 from django.core.management.base import BaseCommand, CommandError
 import django.template
 from django.template import Context
+from django.template.context import RenderContext
+from django.template.loader_tags import BlockContext
 from compressor.compatible import smart_text
 from django.template.loader import get_template  # noqa Leave this in to preload template locations
 from django.template import engines
+from django.utils import translation
 
 from compressor.cache import get_offline_hexdigest, write_offline_manifest, get_offline_manifest
 from compressor.conf import settings
 from compressor.exceptions import (OfflineGenerationError, TemplateSyntaxError,
                                    TemplateDoesNotExist)
+from compressor.offline.discovery import find_compress_templates
+from compressor.storage import flush_precompress
 from compressor.utils import get_mod_func
 
 
+def isolate_render_context(context):
+    """
+    Gives the copy of a context its own render context. ``copy(context)``
+    shares the state of the block tags and the render memo, which the nodes
+    rendered in parallel would change under each other.
+    """
+    render_context = getattr(context, 'render_context', None)
+    if render_context is None:
+        return
+    state = {}
+    for key, value in render_context.flatten().items():
+        if isinstance(value, BlockContext):
+            block_context = BlockContext()
+            for name, blocks in value.blocks.items():
+                block_context.blocks[name] = list(blocks)
+            value = block_context
+        elif isinstance(value, (dict, list)):
+            value = copy(value)
+        state[key] = value
+    context.render_context = RenderContext(state)
+
+
 class Command(BaseCommand):
     help = "Compress content outside of the request/response cycle"
+    # renders the nodes one at a time unless started by handle_inner()
+    executor = None
+    # whether the nodes are compressed even if COMPRESS_ENABLED is off
+    forced = True
 
     def add_arguments(self, parser):
         parser.add_argument('--extension', '-e', action='append', dest='extensions',
@@ -44,6 +77,9 @@ class Command(BaseCommand):
                                  "supported. It may be a specified more than once for "
                                  "multiple engines. If not specified, django engine is used.",
                             dest="engines")
+        parser.add_argument('--workers', type=int, default=1, dest='workers',
+                            help="The number of blocks rendered in parallel "
+                                 "(default: 1).")
 
     def get_loaders(self):
         template_source_loaders = []
@@ -102,7 +138,8 @@ class Command(BaseCommand):
                                          "must set TEMPLATE_LOADERS in your "
                                          "settings or set 'loaders' in your "
                                          "TEMPLATES dictionary.")
-        templates = set()
+        # template path -> names it can be loaded with
+        templates = {}
         if engine == 'django':
             paths = set()
             for loader in self.get_loaders():
@@ -129,15 +166,20 @@ class Command(BaseCommand):
 
             for path in paths:
                 for root, dirs, files in os.walk(path, followlinks=follow_links):
-                    templates.update(os.path.join(root, name)
-                                     for name in files if not name.startswith('.') and
-                                     any(fnmatch(name, "*%s" % glob) for glob in extensions))
+                    for name in files:
+                        if not name.startswith('.') and \
+                                any(fnmatch(name, "*%s" % glob) for glob in extensions):
+                            template_path = os.path.join(root, name)
+                            template_name = os.path.relpath(template_path, path)
+                            templates.setdefault(template_path, set()).add(
+                                template_name.replace(os.sep, '/'))
         elif engine == 'jinja2':
             env = settings.COMPRESS_JINJA2_GET_ENVIRONMENT()
             if env and hasattr(env, 'list_templates'):
-                templates |= set([env.loader.get_source(env, template)[1] for template in
-                                  env.list_templates(filter_func=lambda _path:
-                                  os.path.splitext(_path)[-1] in extensions)])
+                for template in env.list_templates(filter_func=lambda _path:
+                                                   os.path.splitext(_path)[-1] in extensions):
+                    template_path = env.loader.get_source(env, template)[1]
+                    templates.setdefault(template_path, set()).add(template)
 
         if not templates:
             raise OfflineGenerationError("No templates found. Make sure your "
@@ -146,6 +188,12 @@ class Command(BaseCommand):
         if verbosity >= 2:
             log.write("Found templates:\n\t" + "\n\t".join(templates) + "\n")
 
+        if settings.COMPRESS_OFFLINE_PRESCAN:
+            templates = find_compress_templates(templates)
+            if verbosity >= 2:
+                log.write("Templates possibly containing compress tags:\n\t" +
+                          "\n\t".join(templates) + "\n")
+
         contexts = settings.COMPRESS_OFFLINE_CONTEXT
         if isinstance(contexts, six.string_types):
             try:
@@ -190,9 +238,14 @@ class Command(BaseCommand):
         nodes_count = 0
         block_count = 0
         offline_manifest = OrderedDict()
+        # offline key -> future of the rendered node, in rendering order
+        rendering = OrderedDict()
         results = []
         for context_dict in contexts:
             compressor_nodes = OrderedDict()
+            # identities of the nodes rendered for this context, the same
+            # node is often reached from many templates
+            rendered_nodes = set()
             for template in fine_templates:
                 context = Context(parser.get_init_context(context_dict))
 
@@ -216,6 +269,11 @@ class Command(BaseCommand):
                 template._log_verbosity = verbosity
 
                 for node, node_contexts in nodes.items():
+                    identity = parser.get_node_identity(template, node)
+                    if identity is not None:
+                        if identity in rendered_nodes:
+                            continue
+                        rendered_nodes.add(identity)
                     for context in node_contexts:
                         context.push()
                         if not parser.process_template(template, context):
@@ -225,21 +283,19 @@ class Command(BaseCommand):
                         rendered = parser.render_nodelist(template, context, node)
                         key = get_offline_hexdigest(rendered)
 
-                        if key in offline_manifest:
+                        if key in rendering:
                             continue
 
-                        try:
-                            result = parser.render_node(template, context, node)
-                        except Exception as e:
-                            raise CommandError("An error occurred during rendering %s: "
-                                               "%s" % (template.template_name, smart_text(e)))
-                        result = result.replace(
-                            settings.COMPRESS_URL, settings.COMPRESS_URL_PLACEHOLDER
-                        )
-                        offline_manifest[key] = result
+                        rendering[key] = self.submit_node(parser, template, copy(context), node)
                         context.pop()
-                        results.append(result)
-                        block_count += 1
+
+        for key, future in rendering.items():
+            result = future.result().replace(
+                settings.COMPRESS_URL, settings.COMPRESS_URL_PLACEHOLDER
+            )
+            offline_manifest[key] = result
+            results.append(result)
+            block_count += 1
 
         if not nodes_count:
             raise OfflineGenerationError(
@@ -252,6 +308,36 @@ class Command(BaseCommand):
                       (block_count, nodes_count, contexts_count))
         return offline_manifest, block_count, results
 
+    def submit_node(self, parser, template, context, node):
+        """
+        Returns a future of the rendered ``node``, rendered in the thread
+        pool if there is one, in the current language.
+        """
+        # the threads mustn't compile, that may change the shared nodes
+        parser.compile_node(node, forced=self.forced)
+        isolate_render_context(context)
+        if self.executor is None:
+            future = Future()
+            future.set_result(self.render_node(parser, template, context, node))
+            return future
+        return self.executor.submit(
+            self.render_node_in_language, translation.get_language(),
+            parser, template, context, node)
+
+    def render_node_in_language(self, language, *args):
+        with translation.override(language):
+            return self.render_node(*args)
+
+    def render_node(self, parser, template, context, node):
+        """
+        Renders the compress ``node`` of ``template`` for the offline manifest.
+        """
+        try:
+            return parser.render_node(template, context, node, forced=self.forced)
+        except Exception as e:
+            raise CommandError("An error occurred during rendering %s: "
+                               "%s" % (template.template_name, smart_text(e)))
+
     def handle_extensions(self, extensions=('html',)):
         """
         organizes multiple extensions that are separated with commas or
@@ -273,6 +359,21 @@ class Command(BaseCommand):
                 ext_list[i] = '.%s' % ext_list[i]
         return set(ext_list)
 
+    def start_executor(self, workers):
+        """
+        Starts the thread pool rendering the nodes unless ``workers`` is 1,
+        ``None`` standing for the pool's default number of threads.
+        """
+        if workers is None or workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.executor = None
+
+    def stop_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
     def handle(self, **options):
         self.handle_inner(**options)
 
@@ -296,12 +397,18 @@ class Command(BaseCommand):
         final_offline_manifest = {}
         final_block_count = 0
         final_results = []
-        for engine in engines:
-            offline_manifest, block_count, results = self.compress(engine, extensions, verbosity, follow_links, log)
-            final_results.extend(results)
-            final_block_count += block_count
-            final_offline_manifest.update(offline_manifest)
+        self.start_executor(options.get("workers", 1))
+        try:
+            for engine in engines:
+                offline_manifest, block_count, results = self.compress(engine, extensions, verbosity, follow_links, log)
+                final_results.extend(results)
+                final_block_count += block_count
+                final_offline_manifest.update(offline_manifest)
+        finally:
+            self.stop_executor()
         write_offline_manifest(final_offline_manifest)
+        # offline builds are done once all files are precompressed
+        flush_precompress()
         return final_block_count, final_results
 
 
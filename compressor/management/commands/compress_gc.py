@@ -0,0 +1,110 @@
+import os
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from compressor.cache import get_offline_manifest, get_offline_manifest_filename
+from compressor.conf import settings
+from compressor.storage import (compact_output_log, default_storage, precompressors,
+                                read_output_log)
+
+
+class Command(BaseCommand):
+    help = ("Remove generated files in COMPRESS_OUTPUT_DIR which aren't "
+            "referenced by the offline manifest or recently rendered blocks "
+            "anymore")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-n', '--dry-run', action='store_true', dest='dry_run',
+            help="Only list the files which would be removed.")
+        parser.add_argument(
+            '--grace', type=int, default=7 * 24 * 60 * 60, dest='grace',
+            help="Keep files modified less than this many seconds ago "
+                 "(default: 7 days).")
+        parser.add_argument(
+            '--keep-list', action='append', default=[], dest='keep_lists',
+            metavar='FILE',
+            help="A file listing further paths or URLs to keep, one per line, "
+                 "e.g. taken from an access log. Use multiple times to read "
+                 "more files.")
+
+    def get_output_files(self, path):
+        """
+        Yields the names of all files below ``path`` in the storage.
+        """
+        dirs, files = default_storage.listdir(path)
+        for filename in files:
+            yield '%s/%s' % (path, filename)
+        for dirname in dirs:
+            for name in self.get_output_files('%s/%s' % (path, dirname)):
+                yield name
+
+    def get_live_files(self, output_dir, keep_lists, since):
+        """
+        Returns the names of the output files referenced in the offline
+        manifest and in the given keep lists, and those recorded in
+        ``COMPRESS_OUTPUT_LOG`` at or after the timestamp ``since``.
+        """
+        name_re = re.compile(r'%s/[^\s"\'<>?#)]+' % re.escape(output_dir))
+        sources = list(get_offline_manifest().values())
+        for keep_list in keep_lists:
+            with open(keep_list) as fp:
+                sources.append(fp.read())
+        live = set()
+        for source in sources:
+            live.update(name_re.findall(source))
+        if settings.COMPRESS_OUTPUT_LOG:
+            live.update(read_output_log(since))
+        return live
+
+    def handle(self, **options):
+        output_dir = settings.COMPRESS_OUTPUT_DIR.strip('/')
+        manifest_name = get_offline_manifest_filename().replace(os.sep, '/')
+        if settings.COMPRESS_OFFLINE:
+            if not options['keep_lists'] and not default_storage.exists(manifest_name):
+                raise CommandError(
+                    "No offline manifest found at '%s'. Run the 'compress' "
+                    "command first or give a keep list." % manifest_name)
+        elif not settings.COMPRESS_OUTPUT_LOG:
+            raise CommandError(
+                "The output files of blocks rendered during requests aren't "
+                "recorded. Set COMPRESS_OUTPUT_LOG or use offline compression.")
+        if not default_storage.exists(output_dir):
+            return
+
+        # cached blocks keep using their files for COMPRESS_REBUILD_TIMEOUT
+        since = time.time() - settings.COMPRESS_REBUILD_TIMEOUT - options['grace']
+        live = self.get_live_files(output_dir, options['keep_lists'], since)
+        live.add(manifest_name)
+        if settings.COMPRESS_OUTPUT_LOG:
+            live.add('%s/%s' % (output_dir, settings.COMPRESS_OUTPUT_LOG))
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        removed = 0
+        for name in self.get_output_files(output_dir):
+            base, extension = os.path.splitext(name)
+            # precompressed variants and source maps live as long as their original
+            if extension[1:] in precompressors or extension == '.map':
+                name_to_check = base
+            else:
+                name_to_check = name
+            if name_to_check in live:
+                continue
+            if default_storage.get_modified_time(name) > cutoff:
+                continue
+            if options['dry_run']:
+                self.stdout.write("Would remove %s" % name)
+            else:
+                default_storage.delete(name)
+            removed += 1
+
+        if options['dry_run']:
+            self.stdout.write("%d stale file(s) would be removed." % removed)
+        else:
+            if settings.COMPRESS_OUTPUT_LOG:
+                # the log only grows by the blocks rendered in between
+                compact_output_log(since)
+            self.stdout.write("Removed %d stale file(s)." % removed)
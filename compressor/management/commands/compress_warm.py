@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import CommandError
+
+from compressor.conf import settings
+from compressor.management.commands.compress import Command as CompressCommand
+from compressor.storage import flush_precompress
+
+
+class Command(CompressCommand):
+    help = ("Fill the cache used when compressing during the request/response "
+            "cycle by rendering the 'compress' nodes of all templates")
+    # render the nodes the way the templatetag does during a request, which
+    # stores the output and the mtimes of the compressed files in the cache
+    forced = False
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        # use the thread pool's default number of threads
+        parser.set_defaults(workers=None)
+
+    def handle_inner(self, **options):
+        if not settings.COMPRESS_ENABLED:
+            raise CommandError(
+                "Compressor is disabled. Set the COMPRESS_ENABLED setting "
+                "to use the cache.")
+        if settings.COMPRESS_OFFLINE:
+            raise CommandError(
+                "Offline compression is enabled, the cache isn't used. Run "
+                "the 'compress' command instead.")
+
+        log = options.get("log", sys.stdout)
+        verbosity = options.get("verbosity", 1)
+        follow_links = options.get("follow_links", False)
+        extensions = self.handle_extensions(options.get("extensions") or ["html"])
+        engines = [e.strip() for e in options.get("engines", [])] or ["django"]
+
+        results = []
+        self.start_executor(options.get("workers"))
+        try:
+            for engine in engines:
+                results.extend(self.compress(engine, extensions, verbosity, follow_links, log)[2])
+        finally:
+            self.stop_executor()
+        flush_precompress()
+        if verbosity >= 1:
+            log.write("Warmed the cache for %d block(s).\n" % len(results))
+        return len(results), results
@@ -0,0 +1,86 @@
+"""
+Finds the templates the offline compression has to parse without parsing
+all of them.
+
+Only templates mentioning ``compress`` or extending such a template can
+contain compress nodes; the templates are searched for both in their raw
+bytes. The results are cached by the files' modification times and sizes.
+"""
+import os
+import re
+
+from compressor.cache import cache, get_cachekey
+from compressor.conf import settings
+
+EXTENDS_RE = re.compile(br"""{%-?\s*extends\s+(?:(["'])(?P<name>.*?)\1)?""")
+
+
+def scan_template(path):
+    """
+    Returns whether the template at ``path`` mentions ``compress`` and the
+    names of the templates it extends, None standing for one given by a
+    variable.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    extends = []
+    for match in EXTENDS_RE.finditer(content):
+        name = match.group('name')
+        extends.append(None if name is None else name.decode('utf-8', 'replace'))
+    return b'compress' in content, extends
+
+
+def get_template_index_cachekey():
+    return get_cachekey('offline.template_index')
+
+
+def find_compress_templates(templates):
+    """
+    Returns the paths of the templates which may contain compress nodes.
+
+    ``templates`` maps the path of each template to the names it can be
+    loaded with. Templates extending one with an unknown name are kept.
+    """
+    cachekey = get_template_index_cachekey()
+    index = cache.get(cachekey) or {}
+    new_index = {}
+    scans = {}
+    for path in templates:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # let the parser report it
+            scans[path] = (True, [])
+            continue
+        entry = index.get(path)
+        if entry is None or entry[0] != (stat.st_mtime, stat.st_size):
+            try:
+                entry = ((stat.st_mtime, stat.st_size), scan_template(path))
+            except IOError:
+                scans[path] = (True, [])
+                continue
+        new_index[path] = entry
+        scans[path] = entry[1]
+    if new_index != index:
+        cache.set(cachekey, new_index, settings.COMPRESS_OFFLINE_TIMEOUT)
+
+    known_names = set()
+    for names in templates.values():
+        known_names.update(names)
+    relevant = set(path for path, (has_compress, _) in scans.items() if has_compress)
+    relevant_names = set()
+    for path in relevant:
+        relevant_names.update(templates[path])
+    # follow the extends chains until no template is added
+    changed = True
+    while changed:
+        changed = False
+        for path, (_, extends) in scans.items():
+            if path in relevant:
+                continue
+            if any(name is None or name not in known_names or name in relevant_names
+                   for name in extends):
+                relevant.add(path)
+                relevant_names.update(templates[path])
+                changed = True
+    return relevant
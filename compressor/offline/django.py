@@ -3,7 +3,7 @@ from copy import copy
 
 from django import template
 from django.template import Context
-from django.template.base import Node, VariableNode, TextNode, NodeList
+from django.template.base import Node, VariableNode, TextNode, NodeList, Variable
 from django.template.defaulttags import IfNode
 from django.template.loader import get_template
 from django.template.loader_tags import BLOCK_CONTEXT_KEY, ExtendsNode, BlockNode, BlockContext
@@ -13,7 +13,53 @@ from compressor.exceptions import TemplateSyntaxError, TemplateDoesNotExist
 from compressor.templatetags.compress import CompressorNode
 
 
-def handle_extendsnode(extendsnode, context):
+def iter_node_tokens(node):
+    """
+    Yields where each node of the tree below ``node`` comes from and its
+    token's contents.
+    """
+    origin = getattr(node, 'origin', None)
+    token = getattr(node, 'token', None)
+    yield (getattr(origin, 'name', None),
+           getattr(token, 'lineno', None),
+           getattr(token, 'contents', None))
+    for attr in node.child_nodelists:
+        for child in getattr(node, attr, None) or []:
+            for item in iter_node_tokens(child):
+                yield item
+
+
+class ExtendsCache(object):
+    """
+    Remembers the parent templates and the expanded node trees of extends
+    nodes whose chain of parents doesn't depend on the context.
+    """
+    def __init__(self):
+        self.parents = {}
+        self.nodelists = {}
+        # whether a parent given by a variable was found since the last reset
+        self.dynamic = False
+
+    def get_parent(self, extendsnode, context):
+        parent_name = extendsnode.parent_name
+        if parent_name.filters or isinstance(parent_name.var, Variable):
+            self.dynamic = True
+            return extendsnode.get_parent(context)
+        # see ExtendsNode.find_template()
+        history = context.render_context.setdefault(
+            extendsnode.context_key, [extendsnode.origin])
+        key = (id(context.template.engine), parent_name.var,
+               tuple(origin.name for origin in history))
+        try:
+            compiled_parent = self.parents[key]
+        except KeyError:
+            compiled_parent = self.parents[key] = extendsnode.get_parent(context)
+        else:
+            history.append(compiled_parent.origin)
+        return compiled_parent
+
+
+def handle_extendsnode(extendsnode, context, extends_cache=None):
     """Create a copy of Node tree of a derived template replacing
     all blocks tags with the nodes of appropriate blocks.
     Also handles {{ block.super }} tags.
@@ -25,14 +71,17 @@ def handle_extendsnode(extendsnode, context):
                   extendsnode.nodelist.get_nodes_by_type(BlockNode))
     block_context.add_blocks(blocks)
 
-    compiled_parent = extendsnode.get_parent(context)
+    if extends_cache is None:
+        compiled_parent = extendsnode.get_parent(context)
+    else:
+        compiled_parent = extends_cache.get_parent(extendsnode, context)
     parent_nodelist = compiled_parent.nodelist
     # If the parent template has an ExtendsNode it is not the root.
     for node in parent_nodelist:
         # The ExtendsNode has to be the first non-text node.
         if not isinstance(node, TextNode):
             if isinstance(node, ExtendsNode):
-                return handle_extendsnode(node, context)
+                return handle_extendsnode(node, context, extends_cache)
             break
     # Add blocks of the root template to block context.
     blocks = dict((n.name, n) for n in
@@ -91,6 +140,7 @@ def expand_blocknode(node, block_stack, block_context):
 class DjangoParser(object):
     def __init__(self, charset):
         self.charset = charset
+        self.extends_cache = ExtendsCache()
 
     def parse(self, template_name):
         try:
@@ -109,12 +159,24 @@ class DjangoParser(object):
     def process_node(self, template, context, node):
         pass
 
+    def get_node_identity(self, template, node):
+        """
+        Returns a key which is the same for nodes rendering the same in the
+        same context, e.g. one in a base template reached from several
+        templates extending it.
+        """
+        return tuple(iter_node_tokens(node))
+
     def render_nodelist(self, template, context, node):
         context.template = template
         return node.nodelist.render(context)
 
-    def render_node(self, template, context, node):
-        return node.render(context, forced=True)
+    def compile_node(self, node, forced=True):
+        # Django's nodes are rendered as they are
+        pass
+
+    def render_node(self, template, context, node, forced=True):
+        return node.render(context, forced=forced)
 
     def get_nodelist(self, node, original, context=None):
         if isinstance(node, ExtendsNode):
@@ -122,7 +184,15 @@ class DjangoParser(object):
                 if context is None:
                     context = Context()
                 context.template = original
-                return handle_extendsnode(node, context)
+                # the expanded tree is the same for every context unless
+                # a parent template is given by a variable
+                nodelist = self.extends_cache.nodelists.get(node)
+                if nodelist is None:
+                    self.extends_cache.dynamic = False
+                    nodelist = handle_extendsnode(node, context, self.extends_cache)
+                    if not self.extends_cache.dynamic:
+                        self.extends_cache.nodelists[node] = nodelist
+                return nodelist
             except template.TemplateSyntaxError as e:
                 raise TemplateSyntaxError(str(e))
             except template.TemplateDoesNotExist as e:
@@ -62,6 +62,8 @@ class Jinja2Parser(object):
     def __init__(self, charset, env):
         self.charset = charset
         self.env = env
+        # (node, what is rendered) -> compiled template
+        self._compiled = {}
 
     def parse(self, template_name):
         with io.open(template_name, mode='rb') as file:
@@ -91,18 +93,56 @@ class Jinja2Parser(object):
     def process_node(self, template, context, node):
         pass
 
-    def _render_nodes(self, template, context, nodes):
-        compiled_node = self.env.compile(jinja2.nodes.Template(nodes))
-        template = jinja2.Template.from_code(self.env, compiled_node, {})
+    def get_node_identity(self, template, node):
+        # nodes don't know their template, so they can't be told apart
+        return None
+
+    def _get_compiled(self, key, nodes):
+        """
+        Returns the template compiled from ``nodes``, compiling it only the
+        first time for each ``key``. Compiled templates are safe to render
+        from several threads.
+        """
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            code = self.env.compile(jinja2.nodes.Template(nodes))
+            compiled = self._compiled[key] = jinja2.Template.from_code(self.env, code, {})
+        return compiled
+
+    def _render_nodes(self, template, context, nodes, key):
         flat_context = flatten_context(context)
 
-        return template.render(flat_context)
+        return self._get_compiled(key, nodes).render(flat_context)
 
     def render_nodelist(self, template, context, node):
-        return self._render_nodes(template, context, node.body)
-
-    def render_node(self, template, context, node):
-        return self._render_nodes(template, context, [node])
+        return self._render_nodes(template, context, node.body, (node, 'body'))
+
+    def get_method_node(self, node, method):
+        """
+        Returns a copy of the compress ``node`` calling the extension's
+        ``method``, leaving the parsed node as it is.
+        """
+        call = node.call
+        method_call = Call(
+            ExtensionAttribute(call.node.identifier, method, lineno=call.node.lineno),
+            call.args, call.kwargs, call.dyn_args, call.dyn_kwargs, lineno=call.lineno)
+        return CallBlock(method_call, node.args, node.defaults, node.body, lineno=node.lineno)
+
+    def compile_node(self, node, forced=True):
+        """
+        Compiles the compress ``node`` for render_node(). Only the compiled
+        templates are shared with the threads rendering nodes in parallel,
+        so the nodes are compiled before.
+        """
+        method = '_compress_forced' if forced else '_compress_normal'
+        key = (node, method)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._get_compiled(key, [self.get_method_node(node, method)])
+        return compiled
+
+    def render_node(self, template, context, node, forced=True):
+        return self.compile_node(node, forced).render(flatten_context(context))
 
     def get_nodelist(self, node):
         body = getattr(node, "body", getattr(node, "nodes", []))
@@ -118,7 +158,6 @@ class Jinja2Parser(object):
               isinstance(node.call, Call) and
               isinstance(node.call.node, ExtensionAttribute) and
               node.call.node.identifier == self.COMPRESSOR_ID):
-                node.call.node.name = '_compress_forced'
                 yield node
             else:
                 for node in self.walk_nodes(node, block_name=block_name):
@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from urllib.request import pathname2url
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+
+from compressor.cache import cache, simple_cachekey
+from compressor.conf import settings
+from compressor.storage import default_storage
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+
+class JsonManifest(object):
+    """
+    Stores the offline manifest as a JSON object, which is loaded as a whole.
+    """
+    def load(self, filename):
+        if not default_storage.exists(filename):
+            return {}
+        with default_storage.open(filename) as fp:
+            return json.loads(fp.read().decode('utf8'))
+
+    def save(self, filename, manifest):
+        content = json.dumps(manifest, indent=2).encode('utf8')
+        default_storage.save(filename, ContentFile(content))
+
+
+class SqliteManifestEntries(Mapping):
+    """
+    Read-only mapping over the entries of a SQLite manifest which fetches
+    and remembers only the entries that are looked up.
+
+    With ``temporary`` the database is a downloaded copy, removed when the
+    entries are closed or garbage collected.
+    """
+    def __init__(self, path, temporary=False):
+        self.path = path
+        self.temporary = temporary
+        self._entries = {}
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            if self._connection is None:
+                self._connection = sqlite3.connect(
+                    'file:%s?mode=ro' % pathname2url(self.path), uri=True,
+                    check_same_thread=False)
+            return self._connection.execute(sql, params).fetchall()
+
+    def __getitem__(self, key):
+        try:
+            return self._entries[key]
+        except KeyError:
+            rows = self._query('SELECT value FROM manifest WHERE key = ?', (key,))
+            if not rows:
+                raise
+            self._entries[key] = rows[0][0]
+            return rows[0][0]
+
+    def __iter__(self):
+        return iter([row[0] for row in self._query('SELECT key FROM manifest')])
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM manifest')[0][0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            if self.temporary:
+                self.temporary = False
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def __del__(self):
+        self.close()
+
+
+class SqliteManifest(object):
+    """
+    Stores the offline manifest in a SQLite database, so that workers only
+    load the entries of the blocks they actually render.
+
+    Storages without local paths get the database downloaded to a temporary
+    file once.
+    """
+    def load(self, filename):
+        if not default_storage.exists(filename):
+            return {}
+        try:
+            return SqliteManifestEntries(default_storage.path(filename))
+        except NotImplementedError:
+            pass
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        with os.fdopen(fd, 'wb') as f_out, default_storage.open(filename) as f_in:
+            shutil.copyfileobj(f_in, f_out)
+        return SqliteManifestEntries(path, temporary=True)
+
+    def save(self, filename, manifest):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(path)
+            try:
+                connection.execute(
+                    'CREATE TABLE manifest (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+                connection.executemany(
+                    'INSERT INTO manifest (key, value) VALUES (?, ?)',
+                    sorted(manifest.items()))
+                connection.commit()
+            finally:
+                connection.close()
+            with open(path, 'rb') as f:
+                default_storage.save(filename, File(f))
+        finally:
+            os.remove(path)
+
+
+def get_entry_cachekey(key):
+    # independent of COMPRESS_CACHE_KEY_FUNCTION, which may include the
+    # host name, so that all servers find the entries stored by the build
+    return simple_cachekey("offline.manifest.%s" % key)
+
+
+class CacheManifestEntries(Mapping):
+    """
+    Mapping over the manifest entries stored in the cache, which are
+    remembered once looked up. Entries missing from the cache, e.g. after
+    it was flushed, and iterating need the manifest file, loaded once.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._entries = {}
+        self._manifest = None
+
+    def _get_manifest(self):
+        if self._manifest is None:
+            self._manifest = JsonManifest().load(self.filename)
+        return self._manifest
+
+    def __getitem__(self, key):
+        try:
+            return self._entries[key]
+        except KeyError:
+            pass
+        value = cache.get(get_entry_cachekey(key))
+        if value is None:
+            value = self._get_manifest()[key]
+        self._entries[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._get_manifest())
+
+    def __len__(self):
+        return len(self._get_manifest())
+
+
+class CacheManifest(JsonManifest):
+    """
+    Stores each entry of the offline manifest in the cache, for
+    ``COMPRESS_OFFLINE_TIMEOUT`` seconds, so that processes sharing the
+    cache can render offline without the manifest file. The file is still
+    written for tools listing all entries, like the ``compress_gc`` command.
+    """
+    # entries stored with one set_many() call
+    batch_size = 500
+
+    def load(self, filename):
+        return CacheManifestEntries(filename)
+
+    def save(self, filename, manifest):
+        items = list(manifest.items())
+        for i in range(0, len(items), self.batch_size):
+            cache.set_many(
+                dict((get_entry_cachekey(key), value)
+                     for key, value in items[i:i + self.batch_size]),
+                settings.COMPRESS_OFFLINE_TIMEOUT)
+        super(CacheManifest, self).save(filename, manifest)
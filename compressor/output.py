@@ -0,0 +1,133 @@
+"""
+Renders the built-in output templates with string formatting.
+
+Rendering ``compressor/<kind>_<mode>.html`` through the template engine for
+every block is comparatively slow. As long as a template isn't overridden,
+the functions below produce the same markup directly.
+"""
+import os
+
+from django.core.signals import setting_changed
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+def escaped(compressed, key):
+    return conditional_escape(compressed.get(key, ''))
+
+
+def media_attr(compressed):
+    media = compressed.get('media')
+    if media:
+        return ' media="%s"' % conditional_escape(media)
+    return ''
+
+
+def render_css_file(compressed):
+    return '<link rel="stylesheet" href="%s" type="text/css"%s>' % (
+        escaped(compressed, 'url'), media_attr(compressed))
+
+
+def render_css_inline(compressed):
+    return '<style type="text/css"%s>%s</style>' % (
+        media_attr(compressed), compressed.get('content', ''))
+
+
+def render_css_preload(compressed):
+    return '<link rel="preload" href="%s" as="style" />' % escaped(compressed, 'url')
+
+
+def render_js_file(compressed):
+    return '<script src="%s"%s></script>' % (
+        escaped(compressed, 'url'), escaped(compressed, 'extra'))
+
+
+def render_js_inline(compressed):
+    return '<script>%s</script>' % compressed.get('content', '')
+
+
+def render_js_preload(compressed):
+    return '<link rel="preload" href="%s" as="script" />' % escaped(compressed, 'url')
+
+
+def render_parcel_file(compressed):
+    output = ''
+    if compressed.get('css'):
+        output += '\n\n<link rel="stylesheet" href="%s" type="text/css">\n\n' % (
+            escaped(compressed, 'css'))
+    output += '\n'
+    if compressed.get('js'):
+        output += '\n\n<script src="%s"%s></script>\n\n' % (
+            escaped(compressed, 'js'), escaped(compressed, 'extra'))
+    return output
+
+
+renderers = {
+    'compressor/css_file.html': render_css_file,
+    'compressor/css_inline.html': render_css_inline,
+    'compressor/css_preload.html': render_css_preload,
+    'compressor/js_file.html': render_js_file,
+    'compressor/js_inline.html': render_js_inline,
+    'compressor/js_preload.html': render_js_preload,
+    'compressor/parcel_file.html': render_parcel_file,
+}
+
+# template name -> renderer, None if the template engine has to be used
+_renderer_cache = {}
+
+
+def get_renderer(template_name):
+    """
+    Returns the function rendering ``template_name`` if it's a built-in
+    template which the template loaders don't find overridden, else None.
+    """
+    try:
+        return _renderer_cache[template_name]
+    except KeyError:
+        pass
+    renderer = renderers.get(template_name)
+    if renderer is not None and not is_builtin(template_name):
+        renderer = None
+    _renderer_cache[template_name] = renderer
+    return renderer
+
+
+def is_builtin(template_name):
+    """
+    Returns whether the template loaders find the built-in template
+    ``template_name``, rendered by an engine with the default escaping.
+    """
+    try:
+        template = get_template(template_name)
+    except TemplateDoesNotExist:
+        return False
+    origin = getattr(template, 'origin', None)
+    engine = getattr(getattr(template, 'template', None), 'engine', None)
+    if origin is None or engine is None:
+        return False
+    if not engine.autoescape or engine.string_if_invalid:
+        return False
+    builtin_path = os.path.join(TEMPLATES_DIR, *template_name.split('/'))
+    return os.path.abspath(origin.name) == builtin_path
+
+
+def render_output_template(template_name, context):
+    """
+    Renders the output template ``template_name`` like ``render_to_string``.
+    Returns None if it has to be rendered by the template engine.
+    """
+    renderer = get_renderer(template_name)
+    if renderer is None:
+        return None
+    return mark_safe(renderer(context.get('compressed') or {}))
+
+
+def reset_renderer_cache(**kwargs):
+    _renderer_cache.clear()
+
+
+setting_changed.connect(reset_renderer_cache)
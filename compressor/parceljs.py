@@ -1,5 +1,10 @@
+import json
+
+from compressor import sourcemap
 from compressor.conf import settings
 from compressor.js import JsCompressor
+from compressor.output import render_output_template
+from compressor.storage import record_output
 from compressor.base import (render_to_string, os,
                              CompressorError, mark_safe, post_compress, ContentFile, get_hexdigest
                              )
@@ -20,8 +25,9 @@ class ParcelJsCompressor(JsCompressor):
         if basename:
             filename = os.path.split(basename)[1]
             parts.append(os.path.splitext(filename)[0])
-        parts.extend([get_hexdigest(content, 12), resource_kind])
-        return os.path.join(self.output_dir, resource_kind, '.'.join(parts))
+        digest = get_hexdigest(content, 12)
+        parts.extend([digest, resource_kind])
+        return self.get_output_filepath(resource_kind, digest, '.'.join(parts))
 
     def filter(self, content, filters, method, **kwargs):
         for filter_cls in filters:
@@ -44,7 +50,7 @@ class ParcelJsCompressor(JsCompressor):
         content = {'js': None, 'css': None}
         for hunk in self.hunks(forced=True):
             for key, value in hunk:
-                content[key] = f"{content[key]}; {value}" if content[key] else value
+                content[key] = sourcemap.concatenate([content[key], value], '; ') if content[key] else value
         return list(content.items())
 
     def output(self, *args, **kwargs):
@@ -87,8 +93,17 @@ class ParcelJsCompressor(JsCompressor):
             if value:
                 new_filepath = self.handle_parcel_filepath(value, key, basename=basename)
                 if not self.storage.exists(new_filepath) or forced:
+                    source_map = sourcemap.get_source_map(value)
+                    if source_map:
+                        # the map is written next to the file and referenced by name
+                        map_filepath = new_filepath + '.map'
+                        self.storage.save(map_filepath, ContentFile(
+                            json.dumps(source_map).encode(self.charset)))
+                        value += sourcemap.get_source_mapping_url_comment(
+                            key, os.path.basename(map_filepath))
                     file_content = value.encode(self.charset)
                     self.storage.save(new_filepath, ContentFile(file_content))
+                record_output(new_filepath)
                 content_url.update({key: mark_safe(self.storage.url(new_filepath))})
         return self.render_output(mode, content_url)
 
@@ -128,4 +143,7 @@ class ParcelJsCompressor(JsCompressor):
         post_compress.send(sender=self.__class__, type=self.resource_kind,
                            mode=mode, context=final_context)
         template_name = self.get_template_name(mode)
+        rendered = render_output_template(template_name, final_context)
+        if rendered is not None:
+            return rendered
         return render_to_string(template_name, context=final_context)
@@ -9,6 +9,7 @@ from compressor.parser.lxml import LxmlParser
 from compressor.parser.default_htmlparser import DefaultHtmlParser as HtmlParser
 from compressor.parser.beautifulsoup import BeautifulSoupParser  # noqa
 from compressor.parser.html5lib import Html5LibParser  # noqa
+from compressor.parser.scanner import ScannerParser  # noqa
 
 
 class AutoSelectParser(LazyObject):
@@ -18,6 +19,10 @@ class AutoSelectParser(LazyObject):
         ('lxml.html', LxmlParser),  # lxml, extremely fast
     )
 
+    # parsers of the options whose dependency is importable, see
+    # get_available_parsers()
+    available_parsers = None
+
     def __init__(self, content):
         self._wrapped = None
         self._setup(content)
@@ -26,10 +31,26 @@ class AutoSelectParser(LazyObject):
         return getattr(self._wrapped, name)
 
     def _setup(self, content):
-        for dependency, parser in self.options:
+        for parser in self.get_available_parsers():
             try:
-                import_module(dependency)
                 self._wrapped = parser(content)
                 break
             except (ImportError, TypeError):
                 continue
+
+    @classmethod
+    def get_available_parsers(cls):
+        """
+        Checks the dependencies of the parser options only once instead
+        of on every instantiation.
+        """
+        if cls.available_parsers is None:
+            available_parsers = []
+            for dependency, parser in cls.options:
+                try:
+                    import_module(dependency)
+                except ImportError:
+                    continue
+                available_parsers.append(parser)
+            cls.available_parsers = available_parsers
+        return cls.available_parsers
@@ -1,3 +1,4 @@
+import re
 import sys
 
 import six
@@ -21,6 +22,8 @@ class DefaultHtmlParser(ParserBase, six.moves.html_parser.HTMLParser):
         self._css_elems = []
         self._js_elems = []
         self._current_tag = None
+        # offsets of the lines in content, to turn getpos() into an offset
+        self._line_offsets = [0] + [m.end() for m in re.finditer('\n', content)]
         try:
             self.feed(self.content)
             self.close()
@@ -29,6 +32,13 @@ class DefaultHtmlParser(ParserBase, six.moves.html_parser.HTMLParser):
             line = self.content.splitlines()[lineno]
             raise ParserError("Error while initializing HtmlParser: %s (line: %s)" % (err, repr(line)))
 
+    def get_offset(self):
+        """
+        Returns the offset in content of the tag being handled.
+        """
+        lineno, offset = self.getpos()
+        return self._line_offsets[lineno - 1] + offset
+
     def handle_starttag(self, tag, attrs):
         tag = tag.lower()
         if tag in ('style', 'script'):
@@ -40,19 +50,31 @@ class DefaultHtmlParser(ParserBase, six.moves.html_parser.HTMLParser):
                 'tag': tag,
                 'attrs': attrs,
                 'attrs_dict': dict(attrs),
-                'text': ''
+                'text': '',
+                'source': self.content,
+                'start': self.get_offset(),
+                'end': None,
             })
             self._current_tag = tag
         elif tag == 'link':
+            start = self.get_offset()
             self._css_elems.append({
                 'tag': tag,
                 'attrs': attrs,
                 'attrs_dict': dict(attrs),
-                'text': None
+                'text': None,
+                'source': self.content,
+                'start': start,
+                'end': start + len(self.get_starttag_text()),
             })
 
     def handle_endtag(self, tag):
         if self._current_tag and self._current_tag == tag.lower():
+            if self._current_tag == 'style':
+                elem = self._css_elems[-1]
+            else:
+                elem = self._js_elems[-1]
+            elem['end'] = self.content.index('>', self.get_offset()) + 1
             self._current_tag = None
 
     def handle_data(self, data):
@@ -77,12 +99,6 @@ class DefaultHtmlParser(ParserBase, six.moves.html_parser.HTMLParser):
         return smart_text(elem['text'])
 
     def elem_str(self, elem):
-        tag = {}
-        tag.update(elem)
-        tag['attrs'] = ''
-        if len(elem['attrs']):
-            tag['attrs'] = ' %s' % ' '.join(['%s="%s"' % (name, value) for name, value in elem['attrs']])
-        if elem['tag'] == 'link':
-            return '<%(tag)s%(attrs)s>' % tag
-        else:
-            return '<%(tag)s%(attrs)s>%(text)s</%(tag)s>' % tag
+        # the original markup of the element, up to the end of its source
+        # for a script or style that is never closed
+        return elem['source'][elem['start']:elem['end']]
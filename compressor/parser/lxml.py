@@ -38,6 +38,9 @@ class LxmlParser(ParserBase):
         self.soupparser = soupparser
         self.fromstring = fromstring
         self.tostring = tostring
+        # lxml doesn't keep the source offsets of elements, so the
+        # serialized elements are kept around instead
+        self._elem_strs = {}
         super(LxmlParser, self).__init__(content)
 
     @cached_property
@@ -73,4 +76,9 @@ class LxmlParser(ParserBase):
         return elem.tag
 
     def elem_str(self, elem):
-        return smart_text(self.tostring(elem, method='html', encoding=six.text_type))
+        try:
+            return self._elem_strs[elem]
+        except KeyError:
+            elem_str = smart_text(self.tostring(elem, method='html', encoding=six.text_type))
+            self._elem_strs[elem] = elem_str
+            return elem_str
@@ -0,0 +1,116 @@
+import re
+from html import unescape
+
+from compressor.compatible import smart_text
+from compressor.parser import ParserBase
+
+
+# A tag we care about, or a comment to skip over. Quoted attribute
+# values may contain '>' so they are matched as a whole.
+TAG_RE = re.compile(r"""
+    <!--.*?(?:-->|\Z)
+    |
+    <(?P<tag>script|style|link)(?=[\s/>])
+    (?P<attrs>[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*)
+    >
+""", re.IGNORECASE | re.DOTALL | re.VERBOSE)
+
+ATTR_RE = re.compile(r"""
+    (?P<name>[^\s"'>/=]+)
+    (?:\s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\s"'>]+)))?
+""", re.VERBOSE)
+
+END_TAG_RES = {
+    'script': re.compile(r'</script\s*>', re.IGNORECASE),
+    'style': re.compile(r'</style\s*>', re.IGNORECASE),
+}
+
+
+def parse_attrs(source):
+    attrs = []
+    for match in ATTR_RE.finditer(source):
+        value = match.group('dq')
+        if value is None:
+            value = match.group('sq')
+        if value is None:
+            value = match.group('uq')
+        if value is not None and '&' in value:
+            value = unescape(value)
+        attrs.append((match.group('name').lower(), value))
+    return attrs
+
+
+class ScannerParser(ParserBase):
+    """
+    A parser made for the small and regular HTML inside compress blocks.
+
+    It finds ``<script>``, ``<style>`` and ``<link rel="stylesheet">``
+    elements in a single pass over the content with regular expressions,
+    skipping comments, instead of feeding every tag through a full HTML
+    parser. Elements are dicts like the ones of ``HtmlParser``, including
+    the span of their markup in the content.
+    """
+    def __init__(self, content):
+        super(ScannerParser, self).__init__(content)
+        self._css_elems = []
+        self._js_elems = []
+        self._scan()
+
+    def _scan(self):
+        content = self.content
+        pos = 0
+        while True:
+            match = TAG_RE.search(content, pos)
+            if match is None:
+                break
+            pos = match.end()
+            tag = match.group('tag')
+            if tag is None:
+                # a comment
+                continue
+            tag = tag.lower()
+            attrs = parse_attrs(match.group('attrs'))
+            elem = {
+                'tag': tag,
+                'attrs': attrs,
+                'attrs_dict': dict(attrs),
+                'text': None,
+                'source': content,
+                'start': match.start(),
+            }
+            if tag == 'link':
+                rel = elem['attrs_dict'].get('rel') or ''
+                if rel.lower() != 'stylesheet':
+                    continue
+                self._css_elems.append(elem)
+            else:
+                end_match = END_TAG_RES[tag].search(content, pos)
+                if end_match is None:
+                    elem['text'] = content[pos:]
+                    pos = len(content)
+                else:
+                    elem['text'] = content[pos:end_match.start()]
+                    pos = end_match.end()
+                if tag == 'style':
+                    self._css_elems.append(elem)
+                else:
+                    self._js_elems.append(elem)
+            elem['end'] = pos
+
+    def css_elems(self):
+        return self._css_elems
+
+    def js_elems(self):
+        return self._js_elems
+
+    def elem_name(self, elem):
+        return elem['tag']
+
+    def elem_attribs(self, elem):
+        return elem['attrs_dict']
+
+    def elem_content(self, elem):
+        return smart_text(elem['text'])
+
+    def elem_str(self, elem):
+        return elem['source'][elem['start']:elem['end']]
@@ -0,0 +1,94 @@
+"""
+Carries source maps from the compilers to the output files.
+
+Maps aren't merged mapping by mapping: concatenated content gets an index
+map (a map with "sections") placing each part's map at the line and column
+the part starts at, so the content is never parsed again.
+"""
+import io
+import json
+import os
+import re
+
+import six
+
+SOURCE_MAPPING_URL_RE = re.compile(
+    r'\n?(?://[#@] sourceMappingURL=[^\n]*|/\*[#@] sourceMappingURL=[^\n]*?\*/)\s*$')
+
+
+class MappedText(six.text_type):
+    """
+    Text with the source map of its content, a dict, in ``source_map``.
+    """
+    def __new__(cls, text, source_map=None):
+        obj = super(MappedText, cls).__new__(cls, text)
+        obj.source_map = source_map
+        return obj
+
+
+def get_source_map(text):
+    return getattr(text, 'source_map', None)
+
+
+def strip_source_mapping_url(text):
+    """
+    Removes the comment referencing the source map at the end of ``text``.
+    """
+    return SOURCE_MAPPING_URL_RE.sub('', text)
+
+
+def read_source_map(paths):
+    """
+    Returns the source map in the first existing file of ``paths``, or None.
+    """
+    for path in paths:
+        if os.path.exists(path):
+            with io.open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+    return None
+
+
+def get_source_mapping_url_comment(kind, url):
+    if kind == 'css':
+        return '\n/*# sourceMappingURL=%s */' % url
+    return '\n//# sourceMappingURL=%s' % url
+
+
+def concatenate(parts, separator=''):
+    """
+    Joins ``parts`` with ``separator`` like ``str.join``. If any part has a
+    source map, the result is a ``MappedText`` with an index map of them.
+    """
+    sections = []
+    line = column = 0
+
+    def advance(text, line, column):
+        newlines = text.count('\n')
+        if newlines:
+            return line + newlines, len(text) - text.rfind('\n') - 1
+        return line, column + len(text)
+
+    for i, part in enumerate(parts):
+        if i:
+            line, column = advance(separator, line, column)
+        source_map = get_source_map(part)
+        if source_map:
+            # index maps may not be nested, so their sections are moved
+            part_sections = source_map.get('sections') or [
+                {'offset': {'line': 0, 'column': 0}, 'map': source_map}]
+            for section in part_sections:
+                offset = section['offset']
+                if offset['line']:
+                    section_column = offset['column']
+                else:
+                    section_column = column + offset['column']
+                sections.append({
+                    'offset': {'line': line + offset['line'], 'column': section_column},
+                    'map': section['map'],
+                })
+        line, column = advance(part, line, column)
+
+    text = separator.join(parts)
+    if not sections:
+        return text
+    return MappedText(text, {'version': 3, 'sections': sections})
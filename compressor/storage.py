@@ -1,16 +1,29 @@
 from __future__ import unicode_literals
 import errno
 import gzip
+import io
+import logging
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from importlib import import_module
 import time
 
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.core.signals import setting_changed
+from django.utils.encoding import smart_bytes
 from django.utils.functional import LazyObject, SimpleLazyObject
 
 from compressor.conf import settings
 
 
+logger = logging.getLogger("compressor.storage")
+
+
 class CompressorFileStorage(FileSystemStorage):
     """
     Standard file system storage for files handled by django-compressor.
@@ -36,12 +49,52 @@ class CompressorFileStorage(FileSystemStorage):
     def modified_time(self, name):
         return datetime.fromtimestamp(os.path.getmtime(self.path(name)))
 
+    def save(self, name, content, max_length=None):
+        """
+        Skips writing ``content`` if the file ``name`` already has exactly
+        that content, keeping its modification time stable.
+        """
+        if name is not None and self.exists(name):
+            data = smart_bytes(content.read())
+            if self.is_unchanged(name, data):
+                return name
+            content = ContentFile(data)
+        return super(CompressorFileStorage, self).save(name, content, max_length)
+
+    def is_unchanged(self, name, data):
+        """
+        Returns whether the existing file ``name`` has the content ``data``.
+        The sizes are compared first so changed files are rarely read.
+        """
+        path = self.path(name)
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def _save(self, name, content):
+        """
+        Writes the content to a temporary file next to the target and moves
+        it into place, so other processes never see a missing or partial
+        file, even when they write the same file at the same time.
+        """
+        directory, basename = os.path.split(name)
+        tmp_name = os.path.join(directory, temp_basename(basename))
+        tmp_name = super(CompressorFileStorage, self)._save(tmp_name, content)
+        try:
+            os.replace(self.path(tmp_name), self.path(name))
+        except OSError:
+            self.delete(tmp_name)
+            raise
+        return name.replace('\\', '/')
+
     def get_available_name(self, name, max_length=None):
         """
-        Deletes the given file if it exists.
+        Returns the given name, existing files are replaced when saving.
         """
-        if self.exists(name):
-            self.delete(name)
         return name
 
     def delete(self, name):
@@ -56,63 +109,311 @@ class CompressorFileStorage(FileSystemStorage):
                 raise
 
 
+def temp_basename(basename):
+    return '.%s.%s.tmp' % (basename, uuid.uuid4().hex)
+
+
+def replace_file(path, data):
+    """
+    Atomically replaces the file ``path`` with one containing ``data``.
+    """
+    directory, basename = os.path.split(path)
+    tmp_path = os.path.join(directory, temp_basename(basename))
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+_output_log_lock = threading.Lock()
+
+
+def get_output_log_path():
+    return os.path.join(settings.COMPRESS_ROOT, settings.COMPRESS_OUTPUT_DIR.strip('/'),
+                        settings.COMPRESS_OUTPUT_LOG)
+
+
+def record_output(name):
+    """
+    Appends the name of an output file a block was rendered with to
+    ``COMPRESS_OUTPUT_LOG``, with the current time. Rendered blocks are
+    cached, so the file is in use until the cache entry expires.
+    """
+    if not settings.COMPRESS_OUTPUT_LOG:
+        return
+    path = get_output_log_path()
+    line = '%d %s\n' % (time.time(), name.replace(os.sep, '/'))
+    try:
+        with _output_log_lock:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            with io.open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    except (IOError, OSError) as e:
+        logger.warning("Couldn't record the output file %s: %s", name, e)
+
+
+def parse_output_log_line(line):
+    """
+    Returns the timestamp and the name of a line of the output log, or
+    None for a malformed line.
+    """
+    stamp, _, name = line.rstrip('\n').partition(' ')
+    if name and stamp.isdigit():
+        return int(stamp), name
+    return None
+
+
+def read_output_log_lines():
+    try:
+        with io.open(get_output_log_path(), encoding='utf-8') as f:
+            return f.readlines()
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+    return []
+
+
+def read_output_log(since):
+    """
+    Returns the names of the output files recorded at or after the
+    timestamp ``since``.
+    """
+    names = set()
+    for line in read_output_log_lines():
+        entry = parse_output_log_line(line)
+        if entry is not None and entry[0] >= since:
+            names.add(entry[1])
+    return names
+
+
+def compact_output_log(since):
+    """
+    Rewrites the output log with only the entries recorded at or after the
+    timestamp ``since``, keeping the last one of each name.
+    """
+    with _output_log_lock:
+        lines = read_output_log_lines()
+        if not lines:
+            return
+        latest = {}
+        for line in lines:
+            entry = parse_output_log_line(line)
+            if entry is not None and entry[0] >= since:
+                latest[entry[1]] = entry[0]
+        data = ''.join('%d %s\n' % (stamp, name) for name, stamp in sorted(latest.items()))
+        replace_file(get_output_log_path(), data.encode('utf-8'))
+
+
 compressor_file_storage = SimpleLazyObject(
     lambda: get_storage_class('compressor.storage.CompressorFileStorage')())
 
 
-class GzipCompressorFileStorage(CompressorFileStorage):
+def compress_gzip(data, level):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=level) as gz_out:
+        gz_out.write(data)
+    return out.getvalue()
+
+
+def compress_brotli(data, level):
+    import brotli
+    return brotli.compress(data, quality=level)
+
+
+def compress_zstd(data, level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# file extension -> (compress function, default level)
+precompressors = {
+    'gz': (compress_gzip, 9),
+    'br': (compress_brotli, 11),
+    'zst': (compress_zstd, 3),
+}
+
+# file extension -> the package its compress function needs
+precompressor_packages = {
+    'br': 'brotli',
+    'zst': 'zstandard',
+}
+
+_precompress_executor = None
+# precompression jobs running in the background, see flush_precompress()
+_pending_precompress = set()
+_pending_precompress_lock = threading.Lock()
+
+
+def get_precompress_executor():
     """
-    File system storage that stores gzipped files in addition to the usual files.
+    Returns the thread pool shared by all storages for precompressing
+    files. zlib, brotli and zstandard release the GIL while compressing.
     """
-    def save(self, filename, content):
-        filename = super(GzipCompressorFileStorage, self).save(filename, content)
-        orig_path = self.path(filename)
-        compressed_path = '%s.gz' % orig_path
+    global _precompress_executor
+    if _precompress_executor is None:
+        _precompress_executor = ThreadPoolExecutor(
+            max_workers=settings.COMPRESS_PRECOMPRESS_WORKERS)
+    return _precompress_executor
 
-        with open(orig_path, 'rb') as f_in, open(compressed_path, 'wb') as f_out:
-            with gzip.GzipFile(fileobj=f_out) as gz_out:
-                gz_out.write(f_in.read())
 
-        # Ensure the file timestamps match.
-        # os.stat() returns nanosecond resolution on Linux, but os.utime()
-        # only sets microsecond resolution.  Set times on both files to
-        # ensure they are equal.
-        stamp = time.time()
-        os.utime(orig_path, (stamp, stamp))
-        os.utime(compressed_path, (stamp, stamp))
+def reset_precompress_executor(**kwargs):
+    """
+    Shuts the thread pool down when COMPRESS_PRECOMPRESS_WORKERS changes,
+    the next job starts a new one. Queued jobs still finish.
+    """
+    global _precompress_executor
+    if kwargs.get('setting') != 'COMPRESS_PRECOMPRESS_WORKERS':
+        return
+    executor, _precompress_executor = _precompress_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+setting_changed.connect(reset_precompress_executor)
 
-        return filename
 
+def write_precompressed(path, data, extension, level, stamp):
+    compress = precompressors[extension][0]
+    compressed_path = '%s.%s' % (path, extension)
+    replace_file(compressed_path, compress(data, level))
+    os.utime(compressed_path, (stamp, stamp))
+    return compressed_path
 
-class BrotliCompressorFileStorage(CompressorFileStorage):
+
+def _precompress_done(future):
+    with _pending_precompress_lock:
+        _pending_precompress.discard(future)
+    if future.exception() is not None:
+        logger.error("Precompressing failed: %s", future.exception())
+
+
+def flush_precompress():
     """
-    File system storage that stores brotli files in addition to the usual files.
+    Waits for the precompression jobs running in the background, see
+    ``COMPRESS_PRECOMPRESS_ASYNC``, and raises the error of a failed one.
+    Jobs that failed before are only logged.
+    """
+    while True:
+        with _pending_precompress_lock:
+            futures = list(_pending_precompress)
+        if not futures:
+            break
+        for future in futures:
+            future.result()
+
+
+class PrecompressedCompressorFileStorage(CompressorFileStorage):
+    """
+    File system storage that stores precompressed variants of the files,
+    e.g. gzip (``.gz``) and brotli (``.br``), in addition to the usual files.
+
+    The formats, their levels and the size below which files aren't worth
+    compressing are set with ``COMPRESS_PRECOMPRESS_FORMATS``,
+    ``COMPRESS_PRECOMPRESS_LEVELS`` and ``COMPRESS_PRECOMPRESS_MIN_SIZE``.
+    Variants are compressed from the saved content in parallel.
     """
-    chunk_size = 1024
-
-    def save(self, filename, content):
-        filename = super(BrotliCompressorFileStorage, self).save(filename, content)
-        orig_path = self.path(filename)
-        compressed_path = '%s.br' % orig_path
-
-        import brotli
-        br_compressor = brotli.Compressor()
-        with open(orig_path, 'rb') as f_in, open(compressed_path, 'wb') as f_out:
-            for f_in_data in iter(lambda: f_in.read(self.chunk_size), b''):
-                compressed_data = br_compressor.process(f_in_data)
-                if not compressed_data:
-                    compressed_data = br_compressor.flush()
-                f_out.write(compressed_data)
-            f_out.write(br_compressor.finish())
+    # overrides COMPRESS_PRECOMPRESS_FORMATS if set
+    formats = None
+
+    def get_formats(self):
+        formats = self.formats
+        if formats is None:
+            formats = settings.COMPRESS_PRECOMPRESS_FORMATS
+        for extension in formats:
+            if extension not in precompressors:
+                raise ImproperlyConfigured(
+                    "Unknown precompression format '%s', must be one of: %s" %
+                    (extension, ', '.join(sorted(precompressors))))
+            package = precompressor_packages.get(extension)
+            if package is not None:
+                try:
+                    import_module(package)
+                except ImportError:
+                    raise ImproperlyConfigured(
+                        "Precompression format '%s' requires the %s package" %
+                        (extension, package))
+        return formats
+
+    def _save(self, name, content):
+        # fail before writing anything on misconfigured formats
+        self.get_formats()
+        data = smart_bytes(content.read())
+        name = super(PrecompressedCompressorFileStorage, self)._save(
+            name, ContentFile(data))
+        self.precompress(name, data)
+        return name
+
+    def is_unchanged(self, name, data):
+        if not super(PrecompressedCompressorFileStorage, self).is_unchanged(name, data):
+            return False
+        if len(data) < settings.COMPRESS_PRECOMPRESS_MIN_SIZE:
+            return True
+        # write the variants again if any of them is missing
+        path = self.path(name)
+        return all(os.path.exists('%s.%s' % (path, extension))
+                   for extension in self.get_formats())
+
+    def precompress(self, name, data):
+        """
+        Writes the precompressed variants of the file ``name`` with the
+        content ``data`` and returns their paths. With
+        ``COMPRESS_PRECOMPRESS_ASYNC`` they are written in the background.
+        """
+        if len(data) < settings.COMPRESS_PRECOMPRESS_MIN_SIZE:
+            return []
+        orig_path = self.path(name)
+        jobs = []
+        for extension in self.get_formats():
+            level = settings.COMPRESS_PRECOMPRESS_LEVELS.get(
+                extension, precompressors[extension][1])
+            jobs.append((orig_path, data, extension, level))
+
         # Ensure the file timestamps match.
         # os.stat() returns nanosecond resolution on Linux, but os.utime()
-        # only sets microsecond resolution.  Set times on both files to
+        # only sets microsecond resolution.  Set times on all files to
         # ensure they are equal.
         stamp = time.time()
         os.utime(orig_path, (stamp, stamp))
-        os.utime(compressed_path, (stamp, stamp))
 
-        return filename
+        if settings.COMPRESS_PRECOMPRESS_ASYNC:
+            executor = get_precompress_executor()
+            for job in jobs:
+                future = executor.submit(write_precompressed, *(job + (stamp,)))
+                with _pending_precompress_lock:
+                    _pending_precompress.add(future)
+                future.add_done_callback(_precompress_done)
+            return ['%s.%s' % (orig_path, job[2]) for job in jobs]
+        if len(jobs) == 1:
+            return [write_precompressed(*(jobs[0] + (stamp,)))]
+        executor = get_precompress_executor()
+        futures = [executor.submit(write_precompressed, *(job + (stamp,)))
+                   for job in jobs]
+        return [future.result() for future in futures]
+
+
+class GzipCompressorFileStorage(PrecompressedCompressorFileStorage):
+    """
+    File system storage that stores gzipped files in addition to the usual files.
+    """
+    formats = ('gz',)
+
+
+class BrotliCompressorFileStorage(PrecompressedCompressorFileStorage):
+    """
+    File system storage that stores brotli files in addition to the usual files.
+    """
+    formats = ('br',)
 
 
 class DefaultStorage(LazyObject):
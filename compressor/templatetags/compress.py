@@ -16,6 +16,8 @@ OUTPUT_INLINE = 'inline'
 OUTPUT_PRELOAD = 'preload'
 OUTPUT_MODES = (OUTPUT_FILE, OUTPUT_INLINE, OUTPUT_PRELOAD)
 
+RENDER_MEMO_KEY = 'compressor_render_memo'
+
 
 class CompressorMixin(object):
 
@@ -34,12 +36,11 @@ class CompressorMixin(object):
         return get_class(self.compressors.get(kind),
                          exception=ImproperlyConfigured)
 
-    def get_compressor(self, context, kind):
+    def get_compressor(self, context, kind, content=None):
         cls = self.compressor_cls(kind)
-        return cls(
-            kind,
-            content=self.get_original_content(context),
-            context=context)
+        if content is None:
+            content = self.get_original_content(context)
+        return cls(kind, content=content, context=context)
 
     def debug_mode(self, context):
         if settings.COMPRESS_DEBUG_TOGGLE:
@@ -82,6 +83,13 @@ class CompressorMixin(object):
                 'You may need to run "python manage.py compress". Here '
                 'is the original content:\n\n%s' % (key, original_content))
 
+    def get_render_memo(self, context):
+        """
+        Returns a dict kept while the current template is rendered, to
+        remember the output of the blocks rendered so far, or None.
+        """
+        return None
+
     def render_cached(self, compressor, kind, mode):
         """
         If enabled checks the cache for the given compressor's cache key
@@ -104,23 +112,34 @@ class CompressorMixin(object):
 
         name = name or getattr(self, 'name', None)
         context['compressed'] = {'name': name}
-        compressor = self.get_compressor(context, kind)
+        content = self.get_original_content(context)
+
+        # Identical blocks repeated while rendering, e.g. in loops, are
+        # compressed once, without building their compressor again
+        memo = self.get_render_memo(context)
+        memo_key = (kind, mode, name, forced, content)
+        if memo is not None and memo_key in memo:
+            return memo[memo_key]
+
+        compressor = self.get_compressor(context, kind, content)
 
         # Check cache
         cache_key = None
+        rendered_output = None
         if settings.COMPRESS_ENABLED and not forced:
-            cache_key, cache_content = self.render_cached(compressor, kind, mode)
-            if cache_content is not None:
-                return cache_content
-
-        file_basename = name or getattr(self, 'basename', None)
-        if file_basename is None:
-            file_basename = 'output'
-
-        rendered_output = compressor.output(mode, forced=forced, basename=file_basename)
-        assert isinstance(rendered_output, six.string_types)
-        if cache_key:
-            cache_set(cache_key, rendered_output)
+            cache_key, rendered_output = self.render_cached(compressor, kind, mode)
+
+        if rendered_output is None:
+            file_basename = name or getattr(self, 'basename', None)
+            if file_basename is None:
+                file_basename = 'output'
+
+            rendered_output = compressor.output(mode, forced=forced, basename=file_basename)
+            assert isinstance(rendered_output, six.string_types)
+            if cache_key:
+                cache_set(cache_key, rendered_output)
+        if memo is not None:
+            memo[memo_key] = rendered_output
         return rendered_output
 
 
@@ -135,6 +154,12 @@ class CompressorNode(CompressorMixin, template.Node):
     def get_original_content(self, context):
         return self.nodelist.render(context)
 
+    def get_render_memo(self, context):
+        render_context = getattr(context, 'render_context', None)
+        if render_context is None:
+            return None
+        return render_context.setdefault(RENDER_MEMO_KEY, {})
+
     def render(self, context, forced=False):
 
         # Check if in debug mode
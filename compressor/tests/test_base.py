@@ -5,13 +5,13 @@ import sys
 from tempfile import mkdtemp
 from shutil import rmtree, copytree
 
+import mock
 from bs4 import BeautifulSoup
 
 from django.core.cache.backends import locmem
 from django.test import SimpleTestCase
 from django.test.utils import override_settings
 
-from compressor import cache as cachemod
 from compressor.base import SOURCE_FILE, SOURCE_HUNK
 from compressor.cache import get_cachekey, get_precompiler_cachekey, get_hexdigest
 from compressor.conf import settings
@@ -19,7 +19,9 @@ from compressor.css import CssCompressor
 from compressor.exceptions import FilterDoesNotExist, FilterError
 from compressor.js import JsCompressor
 from compressor.parceljs import ParcelJsCompressor
+from compressor.parser import HtmlParser
 from compressor.storage import DefaultStorage
+from compressor.utils import reset_import_cache
 
 
 def make_soup(markup):
@@ -42,6 +44,15 @@ class TestPrecompiler(object):
         return 'OUTPUT'
 
 
+class CountingParser(HtmlParser):
+    """A parser which counts how often it is instantiated """
+    instances = 0
+
+    def __init__(self, content):
+        CountingParser.instances += 1
+        super(CountingParser, self).__init__(content)
+
+
 class PassthroughPrecompiler(object):
     """A filter whose outputs the input unmodified """
     def __init__(self, content, attrs, filter_type=None, filename=None,
@@ -59,7 +70,6 @@ class PrecompilerAndAbsoluteFilterTestCase(SimpleTestCase):
 
     def setUp(self):
         self.html_orig = '<link rel="stylesheet" href="/static/css/relative_url.css" type="text/css" />'
-        self.html_auto_close_removed = '<link rel="stylesheet" href="/static/css/relative_url.css" type="text/css">'
         self.html_link_to_precompiled_css = '<link rel="stylesheet" href="/static/CACHE/css/relative_url.e8602322bfa6.css" type="text/css">'
         self.html_link_to_absolutized_css = '<link rel="stylesheet" href="/static/CACHE/css/relative_url.376db5682982.css" type="text/css">'
         self.css_orig = "p { background: url('../img/python.png'); }" # content of relative_url.css
@@ -84,8 +94,8 @@ class PrecompilerAndAbsoluteFilterTestCase(SimpleTestCase):
         in the filters setting.
         While at it, ensure that everything runs as expected when compression is enabled.
         """
-        self.helper(enabled=False, use_precompiler=False, use_absolute_filter=False, expected_output=self.html_auto_close_removed)
-        self.helper(enabled=False, use_precompiler=False, use_absolute_filter=True, expected_output=self.html_auto_close_removed)
+        self.helper(enabled=False, use_precompiler=False, use_absolute_filter=False, expected_output=self.html_orig)
+        self.helper(enabled=False, use_precompiler=False, use_absolute_filter=True, expected_output=self.html_orig)
         self.helper(enabled=False, use_precompiler=True, use_absolute_filter=False, expected_output=self.html_link_to_precompiled_css)
         self.helper(enabled=False, use_precompiler=True, use_absolute_filter=True, expected_output=self.html_link_to_absolutized_css)
         self.helper(enabled=True, use_precompiler=False, use_absolute_filter=False, expected_output=self.css_orig)
@@ -267,6 +277,13 @@ class CompressorTestCase(SimpleTestCase):
         output = '<script src="/static/custom/nested/js/8a0fed36c317.js"></script>'
         self.assertEqual(output, JsCompressor('js', self.js).output())
 
+    @override_settings(COMPRESS_OUTPUT_SHARD_LENGTH=2)
+    def test_sharded_output_dir(self):
+        output = '<script src="/static/CACHE/js/8a/8a0fed36c317.js"></script>'
+        self.assertEqual(output, JsCompressor('js', self.js).output())
+        self.assertTrue(os.path.exists(os.path.join(
+            settings.COMPRESS_ROOT, 'CACHE', 'js', '8a', '8a0fed36c317.js')))
+
     @override_settings(COMPRESS_PRECOMPILERS=(
         ('text/foobar', 'compressor.tests.test_base.TestPrecompiler'),
     ), COMPRESS_ENABLED=True)
@@ -324,6 +341,16 @@ class CssMediaTestCase(SimpleTestCase):
         links = make_soup(css_node.output()).find_all('link')
         self.assertEqual(media, [l.get('media', None) for l in links])
 
+    @override_settings(COMPRESS_PARSER='compressor.tests.test_base.CountingParser')
+    def test_split_nodes_share_parser(self):
+        CountingParser.instances = 0
+        css_node = CssCompressor('css', self.css)
+        css_node.output()
+        self.assertEqual(len(css_node.media_nodes), 4)
+        self.assertEqual(CountingParser.instances, 1)
+        for media, subnode in css_node.media_nodes:
+            self.assertIs(subnode.parser, css_node.parser)
+
     @override_settings(COMPRESS_PRECOMPILERS=(
         ('text/foobar', '%s %s {infile} {outfile}' % (sys.executable, os.path.join(test_dir, 'precompiler.py'))),
     ), COMPRESS_ENABLED=False)
@@ -391,10 +418,40 @@ class JSWithParensTestCase(SimpleTestCase):
         self.assertEqual(content[1], 'pollos = {};')
 
 
+@override_settings(
+    COMPRESS_ENABLED=True,
+    COMPRESS_OUTPUT_FILTER_HUNKS=True,
+    COMPRESS_FILTERS={'js': ['compressor.filters.jsmin.rJSMinFilter']},
+)
+class OutputFilterHunksTestCase(SimpleTestCase):
+
+    def test_filter_output_hunks(self):
+        js_node = JsCompressor('js', '<script>var hunks = 1;</script><script>var a = 1;</script>')
+        self.assertTrue(js_node.filter_output_per_hunk)
+        self.assertEqual(js_node.filter_output_hunks(js_node.filter_input()),
+                         'var hunks=1;;\nvar a=1;;')
+
+        js_node = JsCompressor('js', '<script>var hunks = 1;</script><script>var b = 2;</script>')
+        with mock.patch.object(js_node, 'filter_output', wraps=js_node.filter_output) as filter_output:
+            self.assertEqual(js_node.filter_output_hunks(js_node.filter_input()),
+                             'var hunks=1;;\nvar b=2;;')
+        filter_output.assert_called_once_with('var b = 2;;')
+
+    @override_settings(COMPRESS_FILTERS={'js': ['compressor.filters.jsmin.SlimItFilter']})
+    def test_unsafe_output_filter(self):
+        js_node = JsCompressor('js', '<script>var a = 1;</script>')
+        self.assertFalse(js_node.filter_output_per_hunk)
+
+    @override_settings(COMPRESS_OUTPUT_FILTER_HUNKS=False)
+    def test_disabled(self):
+        js_node = JsCompressor('js', '<script>var a = 1;</script>')
+        self.assertFalse(js_node.filter_output_per_hunk)
+
+
 class CacheTestCase(SimpleTestCase):
 
     def setUp(self):
-        cachemod._cachekey_func = None
+        reset_import_cache()
 
     def test_get_cachekey_basic(self):
         self.assertEqual(get_cachekey("foo"), "django_compressor.foo")
@@ -4,6 +4,8 @@ import io
 import os
 import sys
 import mock
+from shutil import rmtree
+from tempfile import mkdtemp
 
 import six
 from compressor.compatible import smart_text
@@ -14,7 +16,9 @@ from django.test.utils import override_settings
 from compressor.cache import cache, get_hashed_mtime, get_hashed_content
 from compressor.conf import settings
 from compressor.css import CssCompressor
+from compressor.filters import pool
 from compressor.filters.base import CompilerFilter, CachedCompilerFilter
+from compressor.filters.datauri import encoded_assets
 from compressor.filters.cssmin import CSSCompressorFilter, rCSSMinFilter
 from compressor.filters.css_default import CssAbsoluteFilter, CssRelativeFilter
 from compressor.filters.jsmin import JSMinFilter, SlimItFilter, CalmjsFilter
@@ -146,6 +150,19 @@ class PrecompilerTestCase(TestCase):
         compiler = CachedCompilerFilter(command=command, **self.cached_precompiler_args)
         self.assertEqual("", compiler.input())
 
+    def test_precompiler_tmp_dir(self):
+        tmp_dir = os.path.join(mkdtemp(), 'scratch')
+        command = '%s %s -f {infile} -o {outfile}' % (sys.executable, self.test_precompiler)
+        try:
+            with self.settings(COMPRESS_TMP_DIR=tmp_dir):
+                compiler = CompilerFilter(
+                    content=self.content, filename=None, charset=None, command=command)
+                self.assertEqual("body { color:#990; }", compiler.input())
+                self.assertEqual(os.path.dirname(compiler.infile.name), tmp_dir)
+                self.assertEqual(os.path.dirname(compiler.outfile.name), tmp_dir)
+        finally:
+            rmtree(os.path.dirname(tmp_dir))
+
 
 class CSSCompressorTestCase(TestCase):
     def test_csscompressor_filter(self):
@@ -202,6 +219,23 @@ class JsMinTestCase(TestCase):
  */var foo="bar";"""
         self.assertEqual(output, JSMinFilter(content).output())
 
+    @override_settings(COMPRESS_FILTER_PROCESSES={'js': 1})
+    def test_process_pool_kept_on_other_settings(self):
+        js_pool = pool.get_pool('js')
+        with override_settings(COMPRESS_ENABLED=True):
+            self.assertIs(js_pool, pool.get_pool('js'))
+        with override_settings(COMPRESS_FILTER_PROCESSES={'js': 2}):
+            self.assertIsNot(js_pool, pool.get_pool('js'))
+
+    @override_settings(COMPRESS_FILTER_PROCESSES={'js': 1})
+    def test_jsmin_filter_in_process_pool(self):
+        self.assertIsNotNone(pool.get_pool('js'))
+        self.assertIsNone(pool.get_pool('css'))
+        filter = JSMinFilter('var foo = "bar";', filter_type='js')
+        filter._callback_func = mock.Mock()
+        self.assertEqual(filter.output(), 'var foo="bar";')
+        self.assertFalse(filter._callback_func.called)
+
 
 class SlimItTestCase(TestCase):
     def test_slimit_filter(self):
@@ -218,6 +252,13 @@ class CalmjsTestCase(TestCase):
         output = """var foo="bar";"""
         self.assertEqual(output, CalmjsFilter(content).output())
 
+    @override_settings(COMPRESS_FILTER_PROCESSES={'js': 1})
+    def test_calmjs_filter_in_process_pool(self):
+        content = """
+        var foo = "bar";"""
+        output = """var foo="bar";"""
+        self.assertEqual(output, CalmjsFilter(content, filter_type='js').output())
+
 
 @override_settings(
         COMPRESS_ENABLED=True,
@@ -426,6 +467,21 @@ class CssRelativizingTestCase(CssAbsolutizingTestCase):
         self.assertEqual(output, filter.input(filename=filename,
                                               basename='css/url/test.css'))
 
+    @override_settings(
+        COMPRESS_CSS_HASHING_METHOD=None,
+        COMPRESS_OUTPUT_SHARD_LENGTH=2
+    )
+    def test_sharded_cache_dir(self):
+        filename = os.path.join(settings.COMPRESS_ROOT, 'css/url/test.css')
+        content = self.template % blankdict(url='../../')
+        params = blankdict({
+            'url': '../../../',
+        })
+        output = self.template % params
+        filter = self.filter_class(content)
+        self.assertEqual(output, filter.input(filename=filename,
+                                              basename='css/url/test.css'))
+
 
 @override_settings(
     COMPRESS_ENABLED=True,
@@ -452,6 +508,24 @@ class CssDataUriTestCase(TestCase):
 ''' % datauri_hash]
         self.assertEqual(out, list(self.css_node.hunks()))
 
+    def test_data_uris_cached(self):
+        encoded_assets.clear()
+        out = list(self.css_node.hunks())
+        with mock.patch('compressor.filters.datauri.open') as open_mock:
+            self.assertEqual(out, list(CssCompressor('css', self.css).hunks()))
+        self.assertFalse(open_mock.called)
+
+    @override_settings(COMPRESS_DATA_URI_CACHE_SIZE=10)
+    def test_data_uri_cache_size(self):
+        encoded_assets.set('a', '123456')
+        encoded_assets.set('b', '1234')
+        encoded_assets.set('c', '12')
+        self.assertIsNone(encoded_assets.get('a'))
+        self.assertEqual(encoded_assets.get('c'), '12')
+        encoded_assets.set('d', '12345678901')
+        self.assertIsNone(encoded_assets.get('d'))
+        self.assertEqual(encoded_assets.size, 6)
+
 
 class TemplateTestCase(TestCase):
     @override_settings(COMPRESS_TEMPLATE_FILTER_CONTEXT={
@@ -0,0 +1,92 @@
+import os
+import shutil
+import time
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+from six import StringIO
+
+from compressor.cache import flush_offline_manifest, write_offline_manifest
+from compressor.conf import settings
+from compressor.storage import get_output_log_path, record_output
+
+
+@override_settings(COMPRESS_OUTPUT_DIR='CACHE_gc', COMPRESS_OUTPUT_LOG='output.log')
+class TestGcCommand(TestCase):
+
+    def setUp(self):
+        flush_offline_manifest()
+        self.output_dir = os.path.join(settings.COMPRESS_ROOT, 'CACHE_gc')
+        os.makedirs(os.path.join(self.output_dir, 'js'))
+        for name, age in [('live.js', 3600), ('live.js.gz', 3600), ('live.js.map', 3600),
+                          ('stale.js', 3600), ('stale.js.gz', 3600), ('stale.js.map', 3600),
+                          ('recent.js', 0)]:
+            path = os.path.join(self.output_dir, 'js', name)
+            with open(path, 'w') as f:
+                f.write('var x;')
+            if age:
+                os.utime(path, (1, 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+        flush_offline_manifest()
+
+    def remaining(self):
+        return sorted(os.listdir(os.path.join(self.output_dir, 'js')))
+
+    @override_settings(COMPRESS_OFFLINE=True)
+    def test_no_manifest(self):
+        with self.assertRaises(CommandError):
+            call_command('compress_gc')
+
+    @override_settings(COMPRESS_OUTPUT_LOG=None)
+    def test_no_output_log(self):
+        with self.assertRaises(CommandError):
+            call_command('compress_gc')
+
+    def test_output_log(self):
+        record_output('CACHE_gc/js/stale.js')
+        with open(get_output_log_path(), 'a') as f:
+            # recorded before COMPRESS_REBUILD_TIMEOUT, no longer cached
+            f.write('%d CACHE_gc/js/live.js\n' % (time.time() - settings.COMPRESS_REBUILD_TIMEOUT - 120))
+        call_command('compress_gc', '--grace=60', stdout=StringIO())
+        self.assertEqual(['recent.js', 'stale.js', 'stale.js.gz', 'stale.js.map'], self.remaining())
+        with open(get_output_log_path()) as f:
+            # the expired entry is dropped
+            self.assertEqual(['CACHE_gc/js/stale.js'], [line.split(' ', 1)[1].strip() for line in f])
+
+    def test_dry_run_keeps_output_log(self):
+        record_output('CACHE_gc/js/stale.js')
+        with open(get_output_log_path(), 'a') as f:
+            f.write('1 CACHE_gc/js/live.js\n')
+        call_command('compress_gc', '--dry-run', stdout=StringIO())
+        with open(get_output_log_path()) as f:
+            self.assertEqual(2, len(f.readlines()))
+
+    def test_removes_stale_files(self):
+        write_offline_manifest({
+            'abc': '<script src="/static/CACHE_gc/js/live.js"></script>',
+        })
+        out = StringIO()
+        call_command('compress_gc', '--grace=60', stdout=out)
+        self.assertIn('Removed 3 stale file(s).', out.getvalue())
+        self.assertEqual(['live.js', 'live.js.gz', 'live.js.map', 'recent.js'], self.remaining())
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'manifest.json')))
+
+    def test_dry_run(self):
+        write_offline_manifest({})
+        out = StringIO()
+        call_command('compress_gc', '--grace=60', '--dry-run', stdout=out)
+        self.assertIn('Would remove CACHE_gc/js/stale.js.gz', out.getvalue())
+        self.assertIn('6 stale file(s) would be removed.', out.getvalue())
+        self.assertEqual(7, len(self.remaining()))
+
+    def test_keep_list(self):
+        keep_list = os.path.join(self.output_dir, 'keep.txt')
+        with open(keep_list, 'w') as f:
+            f.write('GET /static/CACHE_gc/js/stale.js HTTP/1.1\n')
+        call_command('compress_gc', '--grace=60', '--keep-list=%s' % keep_list,
+                     stdout=StringIO())
+        self.assertEqual(['recent.js', 'stale.js', 'stale.js.gz', 'stale.js.map'], self.remaining())
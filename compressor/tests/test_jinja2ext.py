@@ -2,6 +2,7 @@
 from __future__ import with_statement, unicode_literals
 
 from django.test import TestCase
+from mock import patch
 from django.test.utils import override_settings
 
 from compressor.conf import settings
@@ -98,6 +99,17 @@ class TestJinja2CompressorExtension(TestCase):
         out = '<script src="/static/CACHE/js/output.8a0fed36c317.js"></script>'
         self.assertEqual(out, template.render(context))
 
+    def test_repeated_block_compressed_once(self):
+        from compressor.contrib.jinja2ext import CompressorExtension
+        template = self.env.from_string("""{% for i in range(3) %}{% compress js -%}
+        <script type="text/javascript" charset="utf-8">obj.value = "value";</script>
+        {% endcompress %}{% endfor %}""")
+        with patch.object(CompressorExtension, 'render_cached', autospec=True,
+                          return_value=(None, None)) as render_cached_mock:
+            out = template.render()
+        self.assertEqual(1, render_cached_mock.call_count)
+        self.assertEqual(3, out.count('<script src="/static/CACHE/js/output.'))
+
     def test_nonascii_js_tag(self):
         template = self.env.from_string("""{% compress js -%}
         <script src="{{ STATIC_URL }}js/nonasc.js" type="text/javascript" charset="utf-8"></script>
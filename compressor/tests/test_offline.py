@@ -4,22 +4,32 @@ from contextlib import contextmanager
 
 import io
 import os
+import shutil
+import sqlite3
+import tempfile
+import threading
 from importlib import import_module
 
-from mock import patch
+from mock import Mock, patch
 from unittest import SkipTest
 
 import six
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.template import Template, Context
+from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockContext, ExtendsNode
 from django.test import TestCase
 from django.test.utils import override_settings
 
-from compressor.cache import flush_offline_manifest, get_offline_manifest
+from compressor.cache import cache, flush_offline_manifest, get_offline_manifest
+from compressor.offline.discovery import find_compress_templates, get_template_index_cachekey
+from compressor.offline.django import DjangoParser
+from compressor.offline.manifest import SqliteManifest, SqliteManifestEntries, get_entry_cachekey
 from compressor.conf import settings
 from compressor.exceptions import OfflineGenerationError
-from compressor.management.commands.compress import Command as CompressCommand
+from compressor.js import JsCompressor
+from compressor.management.commands.compress import Command as CompressCommand, isolate_render_context
+from compressor.management.commands.compress_warm import Command as WarmCommand
 from compressor.storage import default_storage
 from compressor.utils import get_mod_func
 
@@ -91,6 +101,8 @@ class OfflineTestCaseMixin(object):
     # Engines to test
     engines = ('django', 'jinja2')
     additional_test_settings = None
+    # blocks rendered in parallel by the compress command
+    workers = 1
 
     def setUp(self):
         # Reset template dirs, because it enables us to force compress to
@@ -195,7 +207,8 @@ class OfflineTestCaseMixin(object):
         hashes = self.expected_hash
         if not isinstance(hashes, (list, tuple)):
             hashes = [hashes]
-        count, result = CompressCommand().handle_inner(engines=[engine], verbosity=0)
+        count, result = CompressCommand().handle_inner(
+            engines=[engine], verbosity=0, workers=self.workers)
         self.assertEqual(len(hashes), count)
         self.assertEqual([self._render_script(h) for h in hashes], result)
         rendered_template = self._render_template(engine)
@@ -339,6 +352,55 @@ class SuperMixin:
     engines = ('django',)
 
 
+class OfflineCompressSharedBaseTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'test_shared_base'
+    expected_hash = '822ac7501287'
+    engines = ('django',)
+
+    def _test_offline(self, engine):
+        with patch.object(DjangoParser, 'render_nodelist', autospec=True,
+                          side_effect=DjangoParser.render_nodelist) as render_mock:
+            count, result = CompressCommand().handle_inner(engines=[engine], verbosity=0)
+        self.assertEqual(1, count)
+        self.assertEqual([self._render_script(self.expected_hash)], result)
+        # the node of the base template is rendered once for all templates
+        self.assertEqual(1, render_mock.call_count)
+        self.assertEqual(self._render_result(result) + 'First\n', self._render_template(engine))
+
+
+class OfflineJinja2ParserCompileCacheTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'basic'
+    expected_hash = '822ac7501287'
+    engines = ('jinja2',)
+
+    def test_nodes_compiled_once(self):
+        from compressor.offline.jinja2 import Jinja2Parser
+        env = self._get_jinja2_env()
+        parser = Jinja2Parser(charset=self.CHARSET, env=env)
+        template = parser.parse(self.template_path_jinja2)
+        node = list(parser.walk_nodes(template))[0]
+        with patch.object(env, 'compile', wraps=env.compile) as compile_mock:
+            for context in ({}, {'a': 1}):
+                nodelist = parser.render_nodelist(template, context, node)
+                rendered = parser.render_node(template, context, node)
+        self.assertEqual(2, compile_mock.call_count)
+        self.assertIn('alert("Basic test")', nodelist)
+        self.assertEqual(self._render_script(self.expected_hash).replace(
+            settings.COMPRESS_URL_PLACEHOLDER, settings.COMPRESS_URL), rendered)
+
+    def test_parsed_node_unchanged(self):
+        from compressor.offline.jinja2 import Jinja2Parser
+        parser = Jinja2Parser(charset=self.CHARSET, env=self._get_jinja2_env())
+        template = parser.parse(self.template_path_jinja2)
+        node = list(parser.walk_nodes(template))[0]
+        parser.render_node(template, {}, node, forced=False)
+        parser.render_node(template, {}, node)
+        self.assertEqual('_compress_normal', node.call.node.name)
+        self.assertEqual(
+            {'_compress_forced', '_compress_normal'},
+            set(key[1] for key in parser._compiled))
+
+
 class OfflineCompressBlockSuperTestCase(
         SuperMixin, OfflineTestCaseMixin, TestCase):
     templates_dir = 'test_block_super'
@@ -351,6 +413,23 @@ class OfflineCompressBlockSuperMultipleTestCase(
     expected_hash = 'd3f749e83c81'
 
 
+class OfflineDjangoParserExtendsCacheTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'test_block_super_multiple'
+    expected_hash = 'd3f749e83c81'
+    engines = ('django',)
+
+    def test_extends_expanded_once(self):
+        parser = DjangoParser(charset=self.CHARSET)
+        template = parser.parse(self.template_path)
+        with patch.object(ExtendsNode, 'get_parent', autospec=True,
+                          side_effect=ExtendsNode.get_parent) as get_parent_mock:
+            nodes = list(parser.walk_nodes(template, context=Context()))
+            self.assertEqual(2, get_parent_mock.call_count)
+            self.assertEqual(nodes, list(parser.walk_nodes(template, context=Context({'a': 1}))))
+            self.assertEqual(2, get_parent_mock.call_count)
+        self.assertEqual(1, len(nodes))
+
+
 class OfflineCompressBlockSuperMultipleCachedLoaderTestCase(
         SuperMixin, OfflineTestCaseMixin, TestCase):
     templates_dir = 'test_block_super_multiple_cached'
@@ -406,6 +485,153 @@ class OfflineCompressTemplateTagNamedTestCase(OfflineTestCaseMixin, TestCase):
     expected_hash = '822ac7501287'
 
 
+class OfflineCompressSqliteManifestTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'basic'
+    expected_hash = '822ac7501287'
+    engines = ('django',)
+    additional_test_settings = {
+        'COMPRESS_OFFLINE_MANIFEST': 'manifest.sqlite3',
+        'COMPRESS_OFFLINE_MANIFEST_BACKEND': 'compressor.offline.manifest.SqliteManifest',
+    }
+
+    def tearDown(self):
+        super(OfflineCompressSqliteManifestTestCase, self).tearDown()
+        default_storage.delete(os.path.join('CACHE', 'manifest.sqlite3'))
+        flush_offline_manifest()
+
+    def test_entries_loaded_on_demand(self):
+        CompressCommand().handle_inner(engines=['django'], verbosity=0)
+        manifest = get_offline_manifest()
+        self.assertIsInstance(manifest, SqliteManifestEntries)
+        self.assertEqual({}, manifest._entries)
+        self.assertEqual(1, len(manifest))
+        key = list(manifest)[0]
+        self.assertEqual(self._render_script(self.expected_hash), manifest[key])
+        self.assertEqual([key], list(manifest._entries))
+        self.assertNotIn('missing', manifest)
+
+    def test_opened_read_only(self):
+        CompressCommand().handle_inner(engines=['django'], verbosity=0)
+        manifest = get_offline_manifest()
+        self.assertEqual(1, len(manifest))
+        with self.assertRaises(sqlite3.OperationalError):
+            manifest._query('DELETE FROM manifest')
+
+    def test_temporary_copy_removed(self):
+        CompressCommand().handle_inner(engines=['django'], verbosity=0)
+        # a storage without local paths
+        storage = Mock(exists=default_storage.exists, open=default_storage.open,
+                       path=Mock(side_effect=NotImplementedError))
+        with patch('compressor.offline.manifest.default_storage', storage):
+            manifest = SqliteManifest().load(os.path.join('CACHE', 'manifest.sqlite3'))
+        self.assertTrue(manifest.temporary)
+        self.assertEqual(1, len(manifest))
+        path = manifest.path
+        self.assertTrue(os.path.exists(path))
+        manifest.close()
+        self.assertFalse(os.path.exists(path))
+
+
+class OfflineCompressCacheManifestTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'basic'
+    expected_hash = '822ac7501287'
+    engines = ('django',)
+    additional_test_settings = {
+        'COMPRESS_OFFLINE_MANIFEST_BACKEND': 'compressor.offline.manifest.CacheManifest',
+    }
+
+    def tearDown(self):
+        super(OfflineCompressCacheManifestTestCase, self).tearDown()
+        flush_offline_manifest()
+
+    def test_rendering_without_manifest_file(self):
+        count, result = CompressCommand().handle_inner(engines=['django'], verbosity=0)
+        default_storage.delete(os.path.join('CACHE', 'manifest.json'))
+        flush_offline_manifest()
+        self.assertEqual(self._render_result(result), self._render_template('django'))
+        self.assertEqual(1, len(get_offline_manifest()._entries))
+
+    def test_rendering_without_cache_entries(self):
+        count, result = CompressCommand().handle_inner(engines=['django'], verbosity=0)
+        cache.clear()
+        flush_offline_manifest()
+        self.assertEqual(self._render_result(result), self._render_template('django'))
+
+    def test_entry_cachekey_independent_of_host(self):
+        with self.settings(COMPRESS_CACHE_KEY_FUNCTION='compressor.cache.socket_cachekey'):
+            self.assertEqual(get_entry_cachekey('abc'),
+                             'django_compressor.offline.manifest.abc')
+
+
+class CompressWarmTestCase(OfflineTestCaseMixin, TestCase):
+    templates_dir = 'basic'
+    expected_hash = '822ac7501287'
+    additional_test_settings = {
+        'COMPRESS_OFFLINE': False,
+    }
+
+    def _test_offline(self, engine):
+        count, result = WarmCommand().handle_inner(engines=[engine], verbosity=0)
+        self.assertEqual(1, count)
+        self.assertEqual([self._render_script(self.expected_hash)], result)
+        with patch.object(JsCompressor, 'output', side_effect=AssertionError):
+            self.assertEqual(self._render_result(result), self._render_template(engine))
+
+    def test_offline_enabled(self):
+        with self.settings(COMPRESS_OFFLINE=True):
+            self.assertRaises(CommandError, WarmCommand().handle_inner, verbosity=0)
+
+    def test_jinja2_compiled_in_main_thread(self):
+        from compressor.offline.jinja2 import Jinja2Parser
+        threads = []
+
+        def get_compiled(parser, key, nodes):
+            threads.append(threading.current_thread())
+            return original(parser, key, nodes)
+
+        original = Jinja2Parser._get_compiled
+        with patch.object(Jinja2Parser, '_get_compiled', autospec=True, side_effect=get_compiled):
+            WarmCommand().handle_inner(engines=['jinja2'], verbosity=0)
+        self.assertTrue(threads)
+        self.assertEqual({threading.current_thread()}, set(threads))
+
+
+class TemplateDiscoveryTestCase(TestCase):
+    templates = {
+        'compress.html': '{% load compress %}{% compress js %}{% endcompress %}',
+        'child.html': '{% extends "compress.html" %}',
+        'grandchild.html': "{%- extends 'child.html' -%}",
+        'base.html': '<html></html>',
+        'plain.html': '{% extends "base.html" %}{% include "footer.html" %}',
+        'variable.html': '{% extends base_template %}',
+        'unknown.html': '{% extends "admin/base.html" %}',
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.paths = {}
+        for name, content in self.templates.items():
+            path = os.path.join(self.tmpdir, name)
+            with open(path, 'w') as f:
+                f.write(content)
+            self.paths[path] = set([name])
+        cache.delete(get_template_index_cachekey())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_find_compress_templates(self):
+        found = set(os.path.basename(path) for path in find_compress_templates(self.paths))
+        self.assertEqual(set(['compress.html', 'child.html', 'grandchild.html',
+                              'variable.html', 'unknown.html']), found)
+
+    def test_scans_cached(self):
+        expected = find_compress_templates(self.paths)
+        with patch('compressor.offline.discovery.scan_template') as scan_mock:
+            self.assertEqual(expected, find_compress_templates(self.paths))
+        self.assertFalse(scan_mock.called)
+
+
 class OfflineCompressTestCaseWithContext(OfflineTestCaseMixin, TestCase):
     templates_dir = 'test_with_context'
     expected_hash = 'c6bf81bca7ad'
@@ -442,6 +668,11 @@ class OfflineCompressTestCaseWithContextList(OfflineTestCaseMixin, TestCase):
         return None
 
 
+class OfflineCompressParallelTestCase(OfflineCompressTestCaseWithContextList):
+    # the blocks keep their order when rendered in parallel
+    workers = 3
+
+
 class OfflineCompressTestCaseWithContextListSuper(
         SuperMixin, OfflineCompressTestCaseWithContextList):
     templates_dir = 'test_with_context_super'
@@ -451,6 +682,28 @@ class OfflineCompressTestCaseWithContextListSuper(
     }
 
 
+class OfflineCompressParallelSuperTestCase(OfflineCompressTestCaseWithContextListSuper):
+    # the blocks rendering {{ block.super }} don't share the block context
+    workers = 3
+
+
+class IsolateRenderContextTestCase(TestCase):
+    def test_isolate_render_context(self):
+        context = Context()
+        block_context = BlockContext()
+        block_context.add_blocks({'js': Mock()})
+        context.render_context[BLOCK_CONTEXT_KEY] = block_context
+        context.render_context['memo'] = {}
+        duplicate = copy.copy(context)
+        isolate_render_context(duplicate)
+        self.assertIsNot(context.render_context, duplicate.render_context)
+        self.assertIsNot(block_context, duplicate.render_context[BLOCK_CONTEXT_KEY])
+        duplicate.render_context[BLOCK_CONTEXT_KEY].pop('js')
+        duplicate.render_context['memo']['key'] = 'rendered'
+        self.assertEqual(1, len(block_context.blocks['js']))
+        self.assertEqual({}, context.render_context['memo'])
+
+
 class OfflineCompressTestCaseWithContextGenerator(
         OfflineTestCaseMixin, TestCase):
     templates_dir = 'test_with_context'
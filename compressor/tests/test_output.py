@@ -0,0 +1,49 @@
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.safestring import mark_safe
+
+from compressor.output import get_renderer, render_output_template, renderers
+from compressor.tests.test_base import css_tag
+
+CONTEXTS = [
+    {},
+    {'url': mark_safe('/static/CACHE/css/output.58a8c0714e59.css')},
+    {'url': '/static/a&b.css', 'media': 'print', 'extra': ' async'},
+    {'content': 'p { color: "red" } </style>', 'media': 'screen & print'},
+    {'css': '/static/CACHE/css/x.css', 'js': '/static/CACHE/js/x.js', 'extra': ' defer'},
+    {'js': '/static/CACHE/js/x.js'},
+]
+
+
+class OutputTemplateTestCase(TestCase):
+
+    def test_same_as_templates(self):
+        for template_name in renderers:
+            self.assertIsNotNone(get_renderer(template_name))
+            for context in CONTEXTS:
+                context = {'compressed': context}
+                self.assertEqual(render_to_string(template_name, context),
+                                 render_output_template(template_name, context))
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {
+            'loaders': [('django.template.loaders.locmem.Loader', {
+                'compressor/css_file.html': '<link href="{{ compressed.url }}">',
+            }), 'django.template.loaders.app_directories.Loader'],
+        },
+    }])
+    def test_overridden_template_rendered_by_engine(self):
+        self.assertIsNone(get_renderer('compressor/css_file.html'))
+        self.assertIsNone(render_output_template(
+            'compressor/css_file.html', {'compressed': {'url': '/a.css'}}))
+        self.assertIsNotNone(get_renderer('compressor/js_file.html'))
+
+    def test_unknown_template(self):
+        self.assertIsNone(get_renderer('compressor/custom_file.html'))
+
+    def test_output(self):
+        out = css_tag('/static/CACHE/css/output.58a8c0714e59.css')
+        self.assertEqual(out, render_output_template(
+            'compressor/css_file.html', {'compressed': CONTEXTS[1]}))
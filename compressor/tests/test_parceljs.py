@@ -0,0 +1,95 @@
+from __future__ import with_statement, unicode_literals
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from compressor.filters.parceljs import ParserFilterCSS, ParserFilterJS, get_parcel_args
+from compressor.parceljs import ParcelJsCompressor
+from compressor.sourcemap import MappedText, concatenate, strip_source_mapping_url
+from compressor.tests.test_base import test_dir
+
+
+class StdioParserFilter(ParserFilterCSS):
+    command = '%s %s' % (sys.executable, os.path.join(test_dir, 'precompiler.py'))
+
+
+@override_settings(COMPRESS_ENABLED=True)
+class ParserFilterTestCase(TestCase):
+    def setUp(self):
+        with io.open(os.path.join(test_dir, 'static/css/one.css'), encoding='utf-8') as file:
+            self.content = file.read()
+
+    def test_pipe_mode(self):
+        parser_filter = StdioParserFilter(content=self.content, filter_type='css')
+        output = parser_filter.input(method='input', kind='inline', filename=None)
+        self.assertEqual("body { color:#990; }%s" % os.linesep, output)
+        self.assertIsNone(parser_filter.infile)
+        self.assertIsNone(parser_filter.outfile)
+
+
+class SourceMapTestCase(TestCase):
+    map_a = {'version': 3, 'sources': ['a.js'], 'mappings': 'AAAA'}
+    map_b = {'version': 3, 'sources': ['b.js'], 'mappings': 'AAAA'}
+
+    def test_parcel_args(self):
+        self.assertIn('--no-source-maps', get_parcel_args(offline=True))
+        self.assertNotIn('--no-source-maps', get_parcel_args(offline=False, source_maps=True))
+
+    def test_concatenate_without_maps(self):
+        output = concatenate(['var a;', 'var b;'], '; ')
+        self.assertEqual(output, 'var a;; var b;')
+        self.assertNotIsInstance(output, MappedText)
+
+    def test_concatenate_offsets(self):
+        output = concatenate([MappedText('a\nbc', self.map_a), MappedText('d', self.map_b)], '; ')
+        self.assertEqual(output, 'a\nbc; d')
+        self.assertEqual(output.source_map, {'version': 3, 'sections': [
+            {'offset': {'line': 0, 'column': 0}, 'map': self.map_a},
+            {'offset': {'line': 1, 'column': 4}, 'map': self.map_b},
+        ]})
+
+    def test_concatenate_index_map(self):
+        first = concatenate([MappedText('a', self.map_a), MappedText('b', self.map_b)], '\n')
+        output = concatenate(['xy', first], ';')
+        self.assertEqual(output.source_map['sections'], [
+            {'offset': {'line': 0, 'column': 3}, 'map': self.map_a},
+            {'offset': {'line': 1, 'column': 0}, 'map': self.map_b},
+        ])
+
+    def test_strip_source_mapping_url(self):
+        self.assertEqual(strip_source_mapping_url('var a;\n//# sourceMappingURL=/a.map'), 'var a;')
+        self.assertEqual(strip_source_mapping_url('p{}\n/*# sourceMappingURL=a.css.map */\n'), 'p{}')
+
+    @override_settings(COMPRESS_SOURCE_MAPS=True)
+    def test_read_output_file(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'out.js')
+            with open(path, 'w') as f:
+                f.write('var a;\n//# sourceMappingURL=/out.map')
+            with open(os.path.join(tmpdir, 'out.map'), 'w') as f:
+                json.dump(self.map_a, f)
+            output = ParserFilterJS('').read_output_file(path, 'utf-8')
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(output, 'var a;')
+        self.assertEqual(output.source_map, self.map_a)
+
+    def test_output_file_writes_map(self):
+        compressor = ParcelJsCompressor('parcel', '')
+        content = [('js', MappedText('var sourcemapped;', self.map_a)), ('css', None)]
+        output = compressor.output_file('file', content, forced=True)
+        filepath = compressor.handle_parcel_filepath('var sourcemapped;', 'js')
+        self.assertIn(compressor.storage.url(filepath), output)
+        with compressor.storage.open(filepath) as f:
+            self.assertEqual(
+                f.read().decode('utf-8'),
+                'var sourcemapped;\n//# sourceMappingURL=%s.map' % os.path.basename(filepath))
+        with compressor.storage.open(filepath + '.map') as f:
+            self.assertEqual(json.loads(f.read().decode('utf-8')), self.map_a)
@@ -16,6 +16,7 @@ from django.test.utils import override_settings
 
 from compressor.base import SOURCE_HUNK, SOURCE_FILE
 from compressor.conf import settings
+from compressor.parser import HtmlParser, ScannerParser
 from compressor.tests.test_base import CompressorTestCase
 
 
@@ -152,3 +153,40 @@ class BeautifulSoupParserTests(ParserTestCase, CompressorTestCase):
 
 class HtmlParserTests(ParserTestCase, CompressorTestCase):
     parser_cls = 'compressor.parser.HtmlParser'
+
+    def test_elem_str_keeps_original_markup(self):
+        parser = HtmlParser(
+            '<link rel="stylesheet" href="/static/css/one.css?a=1&amp;b=2" />\n'
+            '  <style media=\'print\'>\np { color: red; }\n</style >\n'
+            '<script async src="/static/js/one.js"></script>')
+        self.assertEqual(
+            [parser.elem_str(elem) for elem in parser.css_elems()],
+            ['<link rel="stylesheet" href="/static/css/one.css?a=1&amp;b=2" />',
+             "<style media='print'>\np { color: red; }\n</style >"])
+        self.assertEqual(
+            [parser.elem_str(elem) for elem in parser.js_elems()],
+            ['<script async src="/static/js/one.js"></script>'])
+
+
+class ScannerParserTests(ParserTestCase, CompressorTestCase):
+    parser_cls = 'compressor.parser.ScannerParser'
+
+    def test_scanner_skips_comments_and_other_links(self):
+        parser = ScannerParser(
+            '<!-- <script src="/static/js/old.js"></script> -->\n'
+            '<link rel="preload" href="/static/css/one.css">\n'
+            '<link rel="stylesheet" href="/static/css/one.css?a=1&amp;b=2" />\n'
+            '<SCRIPT async src=\'/static/js/one.js\'></SCRIPT>\n'
+            '<script>if (a > b) { c = "</div>"; }</script>')
+        css_elems = parser.css_elems()
+        self.assertEqual(len(css_elems), 1)
+        self.assertEqual(parser.elem_attribs(css_elems[0]),
+                         {'rel': 'stylesheet', 'href': '/static/css/one.css?a=1&b=2'})
+        self.assertEqual(parser.elem_str(css_elems[0]),
+                         '<link rel="stylesheet" href="/static/css/one.css?a=1&amp;b=2" />')
+        js_elems = parser.js_elems()
+        self.assertEqual(len(js_elems), 2)
+        self.assertEqual(parser.elem_name(js_elems[0]), 'script')
+        self.assertEqual(parser.elem_attribs(js_elems[0]),
+                         {'async': None, 'src': '/static/js/one.js'})
+        self.assertEqual(parser.elem_content(js_elems[1]), 'if (a > b) { c = "</div>"; }')
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import with_statement, unicode_literals
 
+import mock
+
 from django.template import Template
 from django.test import TestCase
 from sekizai.context import SekizaiContext
@@ -38,5 +40,19 @@ class TestSekizaiCompressorExtension(TestCase):
         context = SekizaiContext()
         html = template.render(context).strip()
         self.assertEqual(html,
-'''<link href="https://cdnjs.cloudflare.com/ajax/libs/select2/4.0.5/css/select2.min.css" rel="stylesheet" type="text/css">
+'''<link href="https://cdnjs.cloudflare.com/ajax/libs/select2/4.0.5/css/select2.min.css" rel="stylesheet" type="text/css" />
 <link rel="stylesheet" href="/static/CACHE/css/output.20f9b535162f.css" type="text/css">''')
+
+    def test_postprocess_classifies_once(self):
+        template_string = '''
+{% load static compress sekizai_tags %}
+{% addtoblock "css" %}<link href="{% static 'css/one.css' %}" rel="stylesheet" type="text/css" />{% endaddtoblock %}
+{% addtoblock "css" %}<link href="https://cdnjs.cloudflare.com/ajax/libs/select2/4.0.5/css/select2.min.css" rel="stylesheet" type="text/css" />{% endaddtoblock %}
+{% render_block "css" postprocessor "compressor.contrib.sekizai.compress" %}'''
+        template = Template(template_string)
+        html = template.render(SekizaiContext())
+        with mock.patch('compressor.contrib.sekizai.Compressor') as compressor:
+            with mock.patch('compressor.contrib.sekizai.get_class') as get_class:
+                self.assertEqual(template.render(SekizaiContext()), html)
+        self.assertFalse(compressor.called)
+        self.assertFalse(get_class.called)
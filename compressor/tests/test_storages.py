@@ -1,8 +1,11 @@
 from __future__ import with_statement, unicode_literals
 import errno
+import gzip
 import os
 import brotli
+from mock import patch
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import ContentFile
 from django.core.files.storage import get_storage_class
 from django.test import TestCase
@@ -25,6 +28,11 @@ class BrotliStorage(LazyObject):
         self._wrapped = get_storage_class('compressor.storage.BrotliCompressorFileStorage')()
 
 
+class PrecompressedStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = get_storage_class('compressor.storage.PrecompressedCompressorFileStorage')()
+
+
 @override_settings(COMPRESS_ENABLED=True)
 class StorageTestCase(TestCase):
     def setUp(self):
@@ -53,6 +61,107 @@ class StorageTestCase(TestCase):
                 decompressed_data += br_decompressor.process(data)
         self.assertEqual(payload, decompressed_data)
 
+    def test_precompressed_storage(self):
+        payload = ','.join([str(i) for i in range(1000)]).encode()
+        precompressed_storage = PrecompressedStorage()
+        with self.settings(COMPRESS_PRECOMPRESS_LEVELS={'br': 5}):
+            precompressed_storage.save('test.txt', ContentFile(payload))
+        path = os.path.join(settings.COMPRESS_ROOT, 'test.txt')
+        with gzip.open('%s.gz' % path) as f:
+            self.assertEqual(payload, f.read())
+        with open('%s.br' % path, 'rb') as f:
+            self.assertEqual(payload, brotli.decompress(f.read()))
+        self.assertEqual(os.path.getmtime(path), os.path.getmtime('%s.gz' % path))
+        self.assertEqual(os.path.getmtime(path), os.path.getmtime('%s.br' % path))
+
+    @override_settings(COMPRESS_PRECOMPRESS_ASYNC=True)
+    def test_precompressed_storage_async(self):
+        payload = ','.join([str(i) for i in range(1000)]).encode()
+        precompressed_storage = PrecompressedStorage()
+        precompressed_storage.save('test.txt', ContentFile(payload))
+        storage.flush_precompress()
+        path = os.path.join(settings.COMPRESS_ROOT, 'test.txt')
+        with gzip.open('%s.gz' % path) as f:
+            self.assertEqual(payload, f.read())
+        with open('%s.br' % path, 'rb') as f:
+            self.assertEqual(payload, brotli.decompress(f.read()))
+        self.assertEqual(os.path.getmtime(path), os.path.getmtime('%s.gz' % path))
+        self.assertEqual(os.path.getmtime(path), os.path.getmtime('%s.br' % path))
+
+    @override_settings(COMPRESS_PRECOMPRESS_MIN_SIZE=100)
+    def test_precompressed_storage_min_size(self):
+        precompressed_storage = PrecompressedStorage()
+        precompressed_storage.save('tiny.txt', ContentFile('yeah yeah'))
+        path = os.path.join(settings.COMPRESS_ROOT, 'tiny.txt')
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists('%s.gz' % path))
+        self.assertFalse(os.path.exists('%s.br' % path))
+
+    @override_settings(COMPRESS_PRECOMPRESS_FORMATS=('gz', 'lzma'))
+    def test_precompressed_storage_unknown_format(self):
+        precompressed_storage = PrecompressedStorage()
+        self.assertRaises(ImproperlyConfigured, precompressed_storage.save,
+                          'unknown_format.txt', ContentFile('yeah yeah'))
+        self.assertFalse(os.path.exists(os.path.join(settings.COMPRESS_ROOT, 'unknown_format.txt')))
+
+    @override_settings(COMPRESS_PRECOMPRESS_FORMATS=('gz', 'zst'))
+    def test_precompressed_storage_missing_package(self):
+        precompressed_storage = PrecompressedStorage()
+        with patch.dict('sys.modules', {'zstandard': None}):
+            self.assertRaises(ImproperlyConfigured, precompressed_storage.save,
+                              'missing_package.txt', ContentFile('yeah yeah'))
+        self.assertFalse(os.path.exists(os.path.join(settings.COMPRESS_ROOT, 'missing_package.txt')))
+
+    def test_precompress_workers_setting(self):
+        executor = storage.get_precompress_executor()
+        with self.settings(COMPRESS_PRECOMPRESS_WORKERS=1):
+            self.assertIsNot(executor, storage.get_precompress_executor())
+            self.assertEqual(1, storage.get_precompress_executor()._max_workers)
+
+    def test_save_unchanged(self):
+        self.default_storage.save('test.txt', ContentFile('yeah yeah'))
+        path = os.path.join(settings.COMPRESS_ROOT, 'test.txt')
+        os.utime(path, (1, 1))
+        self.assertEqual('test.txt', self.default_storage.save('test.txt', ContentFile('yeah yeah')))
+        self.assertEqual(1, os.path.getmtime(path))
+        self.default_storage.save('test.txt', ContentFile('yeah yeah!'))
+        self.assertNotEqual(1, os.path.getmtime(path))
+        with open(path) as f:
+            self.assertEqual('yeah yeah!', f.read())
+
+    def test_save_replaces_file(self):
+        self.default_storage.save('replaced.txt', ContentFile('yeah yeah'))
+        original_remove = os.remove
+        removed = []
+
+        def tracking_remove(path):
+            removed.append(path)
+            original_remove(path)
+
+        try:
+            os.remove = tracking_remove
+            name = self.default_storage.save('replaced.txt', ContentFile('yeah yeah!'))
+        finally:
+            os.remove = original_remove
+        self.assertEqual('replaced.txt', name)
+        self.assertEqual([], removed)
+        with open(os.path.join(settings.COMPRESS_ROOT, 'replaced.txt')) as f:
+            self.assertEqual('yeah yeah!', f.read())
+        self.assertEqual([], [n for n in os.listdir(settings.COMPRESS_ROOT) if n.endswith('.tmp')])
+
+    def test_precompressed_storage_save_unchanged(self):
+        payload = ','.join([str(i) for i in range(1000)]).encode()
+        precompressed_storage = PrecompressedStorage()
+        precompressed_storage.save('test.txt', ContentFile(payload))
+        path = os.path.join(settings.COMPRESS_ROOT, 'test.txt')
+        mtime = os.path.getmtime('%s.gz' % path)
+        precompressed_storage.save('test.txt', ContentFile(payload))
+        self.assertEqual(mtime, os.path.getmtime('%s.gz' % path))
+        # a missing variant is written again
+        os.remove('%s.br' % path)
+        precompressed_storage.save('test.txt', ContentFile(payload))
+        self.assertTrue(os.path.exists('%s.br' % path))
+
     def test_css_tag_with_storage(self):
         template = """{% load compress %}{% compress css %}
         <link rel="stylesheet" href="{{ STATIC_URL }}css/one.css" type="text/css">
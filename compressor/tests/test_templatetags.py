@@ -3,7 +3,7 @@ from __future__ import with_statement, unicode_literals
 import os
 import sys
 
-from mock import Mock
+from mock import Mock, patch
 
 from django.template import Template, Context, TemplateSyntaxError
 from django.test import TestCase
@@ -11,6 +11,7 @@ from django.test.utils import override_settings
 
 from compressor.conf import settings
 from compressor.signals import post_compress
+from compressor.templatetags.compress import CompressorNode
 from compressor.tests.test_base import css_tag, test_dir
 
 from sekizai.context import SekizaiContext
@@ -57,6 +58,19 @@ class TemplatetagTestCase(TestCase):
         out = css_tag("/static/CACHE/css/block_name.393dbcddb48e.css")
         self.assertEqual(out, render(template, self.context))
 
+    def test_repeated_block_compressed_once(self):
+        template = """{% load compress %}{% for i in "abc" %}{% compress js %}
+<script type="text/javascript">obj.value = "value";</script>
+{% endcompress %}{% endfor %}"""
+        with patch.object(CompressorNode, 'render_cached', autospec=True,
+                          return_value=(None, None)) as render_cached_mock:
+            with patch.object(CompressorNode, 'get_compressor', autospec=True,
+                              side_effect=CompressorNode.get_compressor) as get_compressor_mock:
+                out = render(template, self.context)
+        self.assertEqual(1, render_cached_mock.call_count)
+        self.assertEqual(1, get_compressor_mock.call_count)
+        self.assertEqual(3, out.count('<script src="/static/CACHE/js/output.'))
+
     def test_missing_rel_leaves_empty_result(self):
         template = """{% load compress %}{% compress css %}
 <link href="{{ STATIC_URL }}css/one.css" type="text/css">
@@ -287,8 +301,8 @@ class PrecompilerTemplatetagTestCase(TestCase):
         <link rel="stylesheet" type="text/less" href="{{ STATIC_URL }}css/url/test.css"/>
         {% endcompress %}"""
 
-        out = ''.join(['<link rel="stylesheet" type="text/css" href="/static/css/one.css">',
-                       '<link rel="stylesheet" type="text/css" href="/static/css/two.css">',
+        out = ''.join(['<link rel="stylesheet" type="text/css" href="/static/css/one.css"/>',
+                       '<link rel="stylesheet" type="text/css" href="/static/css/two.css"/>',
                        '<link rel="stylesheet" href="/static/CACHE/css/test.222f958fb191.css" type="text/css">'])
         self.assertEqual(out, render(template, self.context))
 
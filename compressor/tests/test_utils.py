@@ -3,12 +3,15 @@ from django.test.utils import override_settings
 from django.conf import settings
 import django.contrib.staticfiles.finders
 import django
+import mock
 
 import compressor.utils.staticfiles
+from compressor.css import CssCompressor
 from compressor.exceptions import FilterError
-from compressor.utils import get_class
+from compressor.utils import get_class, import_path, reset_import_cache
 
 from imp import reload
+from importlib import import_module
 
 
 def get_apps_without_staticfiles(apps):
@@ -56,3 +59,29 @@ class TestGetClass(TestCase):
 
         self.assertTrue(('Failed to import common.uglify.JsUglifySourcemapCompressor. '
                          'ImportError is: No module named' in str(context.exception)))
+
+
+class TestImportPath(TestCase):
+
+    def setUp(self):
+        reset_import_cache()
+
+    def test_import_path_resolves_once(self):
+        with mock.patch('compressor.utils.import_module', wraps=import_module) as mocked:
+            self.assertIs(import_path('compressor.css.CssCompressor'), CssCompressor)
+            self.assertIs(get_class('compressor.css.CssCompressor'), CssCompressor)
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_import_path_caches_errors(self):
+        with mock.patch('compressor.utils.import_module', wraps=import_module) as mocked:
+            for i in range(2):
+                with self.assertRaises(ImportError):
+                    import_path('lessc {infile} {outfile}')
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_import_path_reset_on_setting_changed(self):
+        with mock.patch('compressor.utils.import_module', wraps=import_module) as mocked:
+            import_path('compressor.css.CssCompressor')
+            with override_settings(COMPRESS_PARSER='compressor.parser.HtmlParser'):
+                import_path('compressor.css.CssCompressor')
+        self.assertEqual(mocked.call_count, 2)
@@ -1,8 +1,45 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import os
+from importlib import import_module
+
+import six
+from django.core.signals import setting_changed
+
 from compressor.exceptions import FilterError
 
+# dotted path -> imported object, or the error raised while importing it
+_import_cache = {}
+
+
+def import_path(path):
+    """
+    Imports the object at the given dotted path, e.g. a filter class or a
+    callback function. Each path is resolved once per process, failures
+    included, so later calls are a dict lookup.
+    """
+    try:
+        obj, error = _import_cache[path]
+    except KeyError:
+        obj = error = None
+        try:
+            mod_name, attr_name = get_mod_func(path)
+            obj = getattr(import_module(mod_name), attr_name)
+        except (AttributeError, ImportError, TypeError) as e:
+            error = e
+        _import_cache[path] = obj, error
+    if error is not None:
+        six.reraise(type(error), error, None)
+    return obj
+
+
+def reset_import_cache(**kwargs):
+    _import_cache.clear()
+
+
+setting_changed.connect(reset_import_cache)
+
+
 def get_class(class_string, exception=FilterError):
     """
     Convert a string version of a function name to the callable object.
@@ -12,7 +49,7 @@ def get_class(class_string, exception=FilterError):
             class_string = str(class_string)
             mod_name, class_name = get_mod_func(class_string)
             if class_name:
-                return getattr(__import__(mod_name, {}, {}, [str('')]), class_name)
+                return import_path(class_string)
         except AttributeError as e:
             raise exception('Failed to import %s. AttributeError is: %s' % (class_string, e))
         except ImportError as e:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Compares the speed of the parsers on the content of a typical compress block.
+
+Usage: python scripts/benchmark_parsers.py [-n NUMBER] [-e ELEMENTS]
+"""
+from __future__ import print_function
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PARSERS = (
+    'compressor.parser.ScannerParser',
+    'compressor.parser.HtmlParser',
+    'compressor.parser.LxmlParser',
+    'compressor.parser.Html5LibParser',
+    'compressor.parser.BeautifulSoupParser',
+)
+
+ELEMENTS = (
+    '<link rel="stylesheet" href="/static/css/one.css" type="text/css">',
+    '<style type="text/css">p { border:5px solid green;}</style>',
+    '<link rel="stylesheet" href="/static/css/two.css" type="text/css" media="print">',
+    '<script src="/static/js/one.js" type="text/javascript"></script>',
+    '<script type="text/javascript">obj.value = "value";</script>',
+    '<script async src="/static/js/two.js"></script>',
+)
+
+
+def make_content(count):
+    return '\n'.join(ELEMENTS[i % len(ELEMENTS)] for i in range(count))
+
+
+def run(parser_cls, content):
+    parser = parser_cls(content)
+    for elem in list(parser.css_elems()) + list(parser.js_elems()):
+        parser.elem_name(elem)
+        parser.elem_attribs(elem)
+        parser.elem_str(elem)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('-n', '--number', type=int, default=2000,
+                            help='How many times each block is parsed.')
+    arg_parser.add_argument('-e', '--elements', type=int, default=6,
+                            help='How many elements the compress block contains.')
+    args = arg_parser.parse_args()
+
+    from django.conf import settings
+    settings.configure()
+    from compressor.utils import get_class
+
+    content = make_content(args.elements)
+    print('%d element(s), %d run(s)' % (args.elements, args.number))
+    for path in PARSERS:
+        parser_cls = get_class(path)
+        try:
+            run(parser_cls, content)
+        except Exception as e:
+            print('%-40s skipped: %s' % (path, e))
+            continue
+        seconds = timeit.timeit(lambda: run(parser_cls, content), number=args.number)
+        print('%-40s %8.1f us per block' % (path, seconds / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()